@@ -0,0 +1,383 @@
+from typing import *
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import traceback
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import ipy
+
+
+PROGRAMS = os.path.join(os.path.dirname(__file__), 'programs') # directory with sprites.ipys
+
+CHECKS: List[Callable] = [] # functions that raise AssertionError if a check fails
+
+
+def check(function:Callable) -> Callable:
+    '''
+    Registers a check.
+    '''
+    CHECKS.append(function)
+    return function
+
+
+def run(code:str, frames:int=1, backend:str=ipy.INTERPRETER, **options) -> Tuple[ipy.IPYP, str]:
+    '''
+    Runs the initial commands and some frames of a program without a window
+    and returns the project and what it logged.
+    '''
+    random.seed(0)
+    output = io.StringIO()
+    ipyp = ipy.IPYP(code, 'check.ipyp', [], backend, **options)
+    ipyp.size_update_callback = lambda: None
+    with contextlib.redirect_stdout(output):
+        ipyp.execute(ipyp.pre)
+        for _ in range(frames):
+            ipyp.step()
+    return ipyp, output.getvalue()
+
+
+def error(code:str, frames:int=1, **options) -> str:
+    '''
+    Runs a program that has to fail and returns the last line of its error.
+    '''
+    try:
+        run(code, frames, **options)
+    except ipy.BaseException as e:
+        return e.text.splitlines()[-1]
+    raise AssertionError('no error was raised')
+
+
+# typed arrays
+
+@check
+def integer_overflow():
+    for backend in ipy.BACKENDS:
+        _, output = run(
+            'ARRAY B INTEGER; ARRAYFILL B 3000000000 2; ARRAYMUL B B; ARRAYSUM B S;'\
+                'ARRAY C; ARRAYFILL C 9000000000000000000 2; ARRAYSUM C T; LOG S T;'\
+                'LOOP; ENDLOOP;', backend=backend
+        )
+        assert output == '18000000000000000000 18000000000000000000\n', output
+
+    assert error('ARRAY A INTEGER; APPEND A 1; ARRAYADD A 99999999999999999999; LOOP; ENDLOOP;')\
+        == 'ARRAYADD requires a value that fits in 64 bits for INTEGER arrays'
+    assert error('ARRAY A INTEGER; APPEND A 9223372036854775807; ARRAYADD A 1; LOOP; ENDLOOP;')\
+        == 'ARRAYADD result doesn\'t fit in 64 bits for INTEGER arrays'
+    assert error('ARRAY A INTEGER; ARRAYFILL A 4000000000 2; ARRAYMUL A A; LOOP; ENDLOOP;')\
+        == 'ARRAYMUL result doesn\'t fit in 64 bits for INTEGER arrays'
+
+    huge = '1'+'0'*400 # larger than the largest FLOAT
+    assert error(f'ARRAY A FLOAT; APPEND A {huge}; LOOP; ENDLOOP;') == 'APPEND requires a value that fits in a FLOAT'
+    assert error(f'ARRAY A FLOAT; ARRAYFILL A {huge} 3; LOOP; ENDLOOP;')\
+        == 'ARRAYFILL requires a value that fits in a FLOAT'
+    assert error(f'ARRAY A FLOAT; ARRAYFILL A 1 3; ARRAYADD A {huge}; LOOP; ENDLOOP;')\
+        == 'ARRAYADD requires values that fit in a FLOAT'
+    _, output = run('ARRAY A FLOAT; APPEND A 9223372036854775808; ARRAYSUM A S; LOG S; LOOP; ENDLOOP;')
+    assert output == '9.223372036854776e+18\n', output
+
+
+# maps
+
+@check
+def map_keys():
+    huge = '9'*30
+    _, output = run(
+        f'MAP M INTEGER; MAPSET M 9223372036854775807 1; MAPSET M -9223372036854775808 2;'\
+            f'MAPKEYS M K; LENGTH K L; MAPHAS M {huge} H; LOG L H; LOOP; ENDLOOP;'
+    )
+    assert output == '2 False\n', output
+    _, output = run(f'MAP M; MAPSET M {huge} 1; MAPKEYS M K; LENGTH K L; LOG L; LOOP; ENDLOOP;')
+    assert output == '1\n', output
+
+    assert error(f'MAP M INTEGER; MAPSET M {huge} 1; MAPKEYS M K; LOOP; ENDLOOP;')\
+        == 'MAPSET requires a key that fits in 64 bits for INTEGER maps'
+    assert error(f'MAP M FLOAT; MAPSET M 1{"0"*400} 1; LOOP; ENDLOOP;') == 'MAPSET requires a key that fits in a FLOAT'
+    assert error(f'MAP M STRING FLOAT; MAPSET M "a" 1{"0"*400}; LOOP; ENDLOOP;')\
+        == 'MAPSET requires a value that fits in a FLOAT'
+
+
+# frame timing
+
+@check
+def frame_timer():
+    _, output = run('GETFPS F; GETFRAMETIME T; LOG F T; LOOP; ENDLOOP;')
+    assert output == '0.0 0.0\n', output
+
+    timer = ipy.FrameTimer()
+    assert timer.stats()['fps'] == 0.0 and timer.stats()['frame_ms'] == 0.0
+    start = time.perf_counter()
+    timer.start()
+    for _ in range(3):
+        for phase in range(len(ipy.PHASES)):
+            time.sleep(0.001)
+            timer.mark(phase)
+        timer.finish()
+    elapsed = time.perf_counter()-start
+
+    # every moment between start and the last mark belongs to exactly one phase
+    total = sum([sum(frame) for frame in timer.frames])
+    assert abs(total-elapsed) < 0.001, (total, elapsed)
+    assert timer.frame_time() == sum(timer.frames[-1])
+    stats = timer.stats()
+    phases = sum([stats[f'{name}_ms'] for name in ipy.PHASES])
+    assert abs(phases-total/3*1000) < 1e-6, (phases, total)
+    assert abs(stats['fps']-3/total) < 1e-6
+
+    ipyp, output = run('LOOP; GETFPS F; GETFRAMETIME T; ENDLOOP;')
+    ipyp.timer = timer
+    ipyp.step()
+    assert ipyp.scope['F'].value == stats['fps'] and ipyp.scope['T'].value == stats['frame_ms']
+
+
+# rendering
+
+MOVING = '''
+SETRES 160 120;
+LOADSHEET "sprites.ipys";
+ASSIGN X 0;
+ASSIGN FRAME 0;
+LOOP;
+ADD FRAME 1;
+IFSMALLER FRAME 6;
+FILL 10 10 30;
+IFGREATER FRAME 5;
+FILL 40 10 10;
+ADD X 1.5;
+DRAWSPRITE "ship" X 20;
+DRAWSPRITE "coin" 40 X 1;
+DRAWSPRITE "ship" 100 100;
+ENDLOOP;
+'''
+
+
+def headless(code:str, dirty:bool=False, **options) -> Tuple[ipy.IPYP, ipy.App]:
+    '''
+    Runs the initial commands of a program in a headless app.
+    '''
+    random.seed(0)
+    ipyp = ipy.IPYP(code, 'check.ipyp', [], **options)
+    app = ipy.App(ipyp, headless=True, dirty=dirty)
+    ipyp.execute(ipyp.pre)
+    return ipyp, app
+
+
+def render(code:str, frames:int, windowsize:Tuple[int,int], dirty:bool) -> Tuple[List[bytes], int]:
+    '''
+    Runs frames of a program in a headless app and returns the window pixels
+    after each frame and the amount of frames that only updated changed regions.
+    '''
+    ipyp, app = headless(code, dirty=dirty)
+    app.windowsize = windowsize
+    app.update_size()
+    windows: List[bytes] = []
+    partial: int = 0
+    for _ in range(frames):
+        ipyp.step()
+        app.render()
+        partial += app.updated is not None
+        windows.append(ipy.pg.image.tobytes(app.window, 'RGB'))
+    return windows, partial
+
+
+@check
+def dirty_rects():
+    # moving sprites on the same fill color, then a new fill color
+    for windowsize in [(160,120), (480,360), (500,400)]:
+        full, _ = render(MOVING, 10, windowsize, False)
+        dirty, partial = render(MOVING, 10, windowsize, True)
+        # the first frame, the color change and fractional scales redraw everything
+        assert partial == (0 if windowsize == (500,400) else 8), partial
+        for frame, (a, b) in enumerate(zip(full, dirty)):
+            assert a == b, f'window {windowsize} differs in frame {frame}'
+
+
+
+@check
+def transform_cache():
+    ipyp, _ = headless(
+        'SETRES 64 64; LOADSHEET "sprites.ipys"; LOOP;'\
+            'DRAWTRANSFORM "ship" 10 20 2 0; DRAWTRANSFORM "ship" 10 20 2.001 360.2;'\
+            'DRAWTRANSFORM "coin" 10 20 1 90 TRUE; DRAWTRANSFORM "ship" 10 20 1 45; ENDLOOP;'
+    )
+    for _ in range(3):
+        ipyp.draw_list.clear()
+        ipyp.execute(ipyp.loop)
+    # close transforms share a surface
+    assert (ipyp.transforms.hits, ipyp.transforms.misses) == (9, 3)
+    assert len(ipyp.transforms) == 3
+
+    # the center of a transformed sprite stays where it is without transforming it
+    centers = [(14,24), (14,24), (13,23), (14,24)] # ships are 8x8 and coins 6x6 pixels
+    for (surface, (x, y)), (cx, cy) in zip(ipyp.draw_list, centers):
+        assert abs(x+surface.get_width()/2-cx) <= 0.5 and abs(y+surface.get_height()/2-cy) <= 0.5, (x, y)
+    assert ipyp.draw_list[0][0].get_size() == (16, 16)
+
+    # the cache only fits one ship scaled by 2
+    ipyp, _ = headless(
+        'SETRES 64 64; LOADSHEET "sprites.ipys"; LOOP;'\
+            'DRAWTRANSFORM "ship" 0 0 2 0; DRAWTRANSFORM "ship" 0 0 2 180; DRAWTRANSFORM "ship" 0 0 4 0; ENDLOOP;',
+        transform_cache=16*16*4+100
+    )
+    ipyp.step()
+    assert ipyp.transforms.evictions == 1 and len(ipyp.transforms) == 1
+    assert ipyp.transforms.size == 16*16*4
+
+    assert error('SETRES 64 64; LOADSHEET "sprites.ipys"; DRAWTRANSFORM "ship" 0 0 10000 0; LOOP; ENDLOOP;')\
+        == 'Transformed sprite must not be larger than 2048 pixels'
+    assert error('SETRES 64 64; LOADSHEET "sprites.ipys"; DRAWTRANSFORM "ship" 0 0 0 0; LOOP; ENDLOOP;')\
+        == 'Scale must be greater than 0'
+    for scale, angle in [(1, '1e400'), ('1e400', 0), (1, '-1e400'), ('1e400', '1e400')]:
+        assert error(f'SETRES 64 64; LOADSHEET "sprites.ipys"; DRAWTRANSFORM "ship" 0 0 {scale} {angle}; LOOP; ENDLOOP;')\
+            == 'Scale and angle must be finite'
+
+
+
+@check
+def draw_sprites():
+    setup = 'SETRES 64 64; LOADSHEET "sprites.ipys";'\
+        'ARRAY XS; APPEND XS 1; APPEND XS 2.5; ARRAY YS INTEGER; APPEND YS 3; APPEND YS 4;'\
+        'ARRAY NAMES; APPEND NAMES "coin"; APPEND NAMES "ship";'
+    ipyp, _ = headless(setup+'LOOP; DRAWSPRITES "ship" XS YS; DRAWSPRITES NAMES YS XS 1; ENDLOOP;')
+    ipyp.execute(ipyp.loop)
+    ship, coin = ipyp.sprites['ship'], ipyp.sprites['coin']
+    assert ipyp.draw_list == [(ship, (1, 3)), (ship, (2.5, 4)), (coin, (3, 1)), (ship, (4, 2.5))]
+    assert ipyp.draw_layers == [0, 0, 1, 1] and ipyp.layered
+
+    # the same pixels as a DRAWSPRITE per position
+    drawn, _ = headless(setup+'LOOP; DRAWSPRITES NAMES XS YS; ENDLOOP;')
+    single, _ = headless(setup+'LOOP; DRAWSPRITE "coin" 1 3; DRAWSPRITE "ship" 2.5 4; ENDLOOP;')
+    drawn.step()
+    single.step()
+    assert ipy.pg.image.tobytes(drawn.surface, 'RGB') == ipy.pg.image.tobytes(single.surface, 'RGB')
+
+    assert error(setup+'APPEND XS 3; DRAWSPRITES "ship" XS YS; LOOP; ENDLOOP;')\
+        == 'DRAWSPRITES requires arrays of the same length'
+    assert error(setup+'APPEND NAMES "coin"; DRAWSPRITES NAMES XS YS; LOOP; ENDLOOP;')\
+        == 'DRAWSPRITES requires arrays of the same length'
+    assert error(setup+'DRAWSPRITES "boat" XS YS; LOOP; ENDLOOP;') == 'Sprite boat not found'
+    assert error(setup+'APPEND NAMES "boat"; REMOVE NAMES 0; DRAWSPRITES NAMES XS YS; LOOP; ENDLOOP;')\
+        == 'Sprite boat not found'
+
+
+# tilemaps
+
+@check
+def tilemap_position():
+    setup = 'SETRES 64 64; LOADSHEET "sprites.ipys"; TILEMAP T 4 4 8; SETTILE T 0 0 "ship";'
+    ipyp, _ = headless(setup+'LOOP; DRAWTILEMAP T -1e300 0; DRAWTILEMAP T 1.5 2; ENDLOOP;')
+    ipyp.execute(ipyp.loop)
+    assert [position for _, position in ipyp.draw_list] == [(1.5, 2)]
+
+    for x, y in [('1e400', 0), (0, '-1e400'), ('V', 0)]:
+        ipyp, _ = headless(setup+f'ASSIGN V 1e400; SUB V 1e400; LOOP; DRAWTILEMAP T {x} {y}; ENDLOOP;')
+        try:
+            ipyp.execute(ipyp.loop)
+        except ipy.BaseException as e:
+            assert e.text.splitlines()[-1] == 'Coordinates must be finite', (x, y)
+        else:
+            raise AssertionError('no error was raised')
+
+
+# spatial hashes
+
+def overlapping(rects:Dict[Any, tuple], rect:tuple) -> List[Any]:
+    '''
+    Returns the entities that overlap a rectangle by comparing all of them.
+    '''
+    index = ipy.SpatialHash()
+    return [key for key in rects if index.overlaps(rect, rects[key])]
+
+
+@check
+def spatial_hash():
+    # the same results as comparing every entity, in the order they were added
+    random.seed(1)
+    for cell_size in [1, 16, 32]:
+        index = ipy.SpatialHash(cell_size)
+        rects: Dict[Any, tuple] = {}
+        for step in range(1500):
+            key = (ipy.INTEGER, random.randrange(300))
+            action = random.random()
+            size = random.choice([(8, 8), (6, 6), (40, 12), (300, 300)])
+            position = (random.uniform(-50, 400), random.choice([0, 8, 16, random.uniform(-50, 400)]))
+            if key in rects and action < 0.3:
+                index.move(key, *position)
+                rects[key] = position+rects[key][2:]
+            elif key in rects and action < 0.4:
+                index.remove(key)
+                del rects[key]
+            elif action < 0.8:
+                index.insert(key, position+size)
+                rects[key] = position+size
+            if step%100 == 0:
+                for rect in [(0, 0, 64, 64), (-1e6, -1e6, 2e6, 2e6), (8, 8, 0, 0)]:
+                    assert index.query(rect) == overlapping(rects, rect), (cell_size, step, rect)
+                for key in rects:
+                    assert index.hits(key) == [other for other in overlapping(rects, rects[key]) if other != key]
+                pairs = [
+                    (a, b) for i, a in enumerate(rects) for b in list(rects)[i+1:]
+                        if index.overlaps(rects[a], rects[b])
+                ]
+                assert index.pairs() == pairs, (cell_size, step)
+
+    ipyp, output = run('''
+        LOADSHEET "sprites.ipys"; SPATIAL S 16;
+        SPATIALADD S 3 "ship" 0 0; SPATIALADD S "b" "coin" 8 0; SPATIALADD S 1 "ship" 4 4;
+        SPATIALADD S 3 "coin" 1 1; SPATIALQUERY S 14 0 10 10 EDGE;
+        SPATIALQUERY S -48000 -48000 96000 96000 ALL; SPATIALHITS S 1 H; SPATIALPAIRS S A B;
+        LOOP; ENDLOOP;
+    ''')
+    ids = lambda name: [var.value for var in ipyp.arrays[name]]
+    assert ids('EDGE') == [] # touching edges don't overlap
+    assert ids('ALL') == [3, 'b', 1] and ids('H') == [3, 'b']
+    assert ids('A') == [3, 'b'] and ids('B') == [1, 1]
+
+    # huge rectangles don't visit every cell they touch
+    index = ipy.SpatialHash()
+    index.insert((ipy.INTEGER, 1), (0, 0, 8, 8))
+    index.insert((ipy.INTEGER, 2), (-50000, -50000, 100000, 100000))
+    start = time.perf_counter()
+    for _ in range(100):
+        assert len(index.query((-48000, -48000, 96000, 96000))) == 2
+        index.move((ipy.INTEGER, 2), -49000, -49000)
+    assert index.pairs() == [((ipy.INTEGER, 1), (ipy.INTEGER, 2))]
+    assert time.perf_counter()-start < 0.1
+
+    assert error('LOADSHEET "sprites.ipys"; SPATIAL S; SPATIALDEL S 1; LOOP; ENDLOOP;') == 'Entity 1 not found'
+    assert error('LOADSHEET "sprites.ipys"; SPATIAL S; SPATIALHITS S "a" H; LOOP; ENDLOOP;') == 'Entity a not found'
+    assert error('SPATIALQUERY S 0 0 1 1 Q; LOOP; ENDLOOP;') == 'Unknown spatial hash S'
+    for command in [
+        'SPATIALQUERY S 0 0 1e400 10 Q', 'SPATIALQUERY S 0 -1e400 10 10 Q', 'SPATIALADD S 2 "ship" 1e400 0',
+        'ASSIGN V 1e400; SUB V 1e400; SPATIALMOVE S 1 V 0'
+    ]:
+        assert error(f'LOADSHEET "sprites.ipys"; SPATIAL S; SPATIALADD S 1 "ship" 0 0; {command}; LOOP; ENDLOOP;')\
+            == 'Coordinates must be finite', command
+    ipyp, _ = run('LOADSHEET "sprites.ipys"; SPATIAL S; SPATIALADD S 1 "ship" 0 0; LOOP; ENDLOOP;')
+    try:
+        ipyp.spatial_hashes['S'].move((ipy.INTEGER, 1), float('nan'), 0)
+    except ValueError:
+        pass
+    assert ipyp.spatial_hashes['S'].rects[(ipy.INTEGER, 1)] == (0, 0, 8, 8) # failed moves keep the entity
+    assert error('LOADSHEET "sprites.ipys"; SPATIAL S; SPATIALADD S 1 "boat" 0 0; LOOP; ENDLOOP;')\
+        == 'Sprite boat not found'
+
+
+if __name__ == '__main__':
+    # spritesheets are loaded relative to the programs
+    os.chdir(PROGRAMS)
+    failed: int = 0
+    for function in CHECKS:
+        try:
+            function()
+            print(f'ok      {function.__name__}')
+        except Exception:
+            failed += 1
+            print(f'FAILED  {function.__name__}')
+            print(traceback.format_exc())
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,77 @@
+from typing import *
+import contextlib
+import glob
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import ipy
+
+
+PROGRAMS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programs') # directory with sprites.ipys
+FRAMES = 3 # amount of frames to run each program for
+MEMOIZE = 64 # cache size used when checking memoized runs
+
+
+def run(path:str, backend:str, memoize:int=0, optimize:int=ipy.OPTIMIZE_NONE) -> Tuple[str, str, dict, dict, dict]:
+    '''
+    Runs a program and returns its output, error and final state.
+    '''
+    with open(path, encoding='utf-8') as f:
+        code = f.read()
+
+    random.seed(0)
+    output = io.StringIO()
+    error: str = None
+    ipyp = ipy.IPYP(code, os.path.basename(path), [], backend=backend, memoize=memoize, optimize=optimize)
+    ipyp.size_update_callback = lambda: None
+    if ipyp.jit is not None:
+        ipyp.jit.threshold = 1 # compiling blocks after their first run
+
+    with contextlib.redirect_stdout(output):
+        try:
+            ipyp.execute(ipyp.pre)
+            for _ in range(FRAMES):
+                ipyp.step()
+        except ipy.BaseException as e:
+            error = e.text
+
+    # temporary variables of pure functions are not updated on cached calls
+    skipped: Set[str] = set()
+    for func in ipyp.functions.values():
+        if func.pure:
+            skipped |= func.temporaries
+    scope = {name: (var.type, var.value) for name, var in ipyp.scope.items() if name not in skipped}
+    arrays = {name: [(var.type, var.value) for var in array] for name, array in ipyp.arrays.items()}
+    maps = {name: {key: (var.type, var.value) for key, var in map.items()} for name, map in ipyp.maps.items()}
+    return output.getvalue(), error, scope, arrays, maps
+
+
+if __name__ == '__main__':
+    programs = sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'conformance', '*.ipyp')))
+    # spritesheets are loaded relative to the programs
+    os.chdir(PROGRAMS)
+    failed: int = 0
+
+    for path in programs:
+        reference = run(path, ipy.INTERPRETER)
+        configs = [
+            (backend, memoize, optimize) for backend in ipy.BACKENDS
+                for memoize in [0, MEMOIZE] for optimize in ipy.OPTIMIZATION_LEVELS
+        ]
+        for backend, memoize, optimize in configs[1:]:
+            result = run(path, backend, memoize, optimize)
+            name = f'{os.path.basename(path)} [{backend}'\
+                f'{", memoized" if memoize else ""}{f", optimized {optimize}" if optimize else ""}]'
+            if result == reference:
+                print(f'ok      {name}')
+            else:
+                failed += 1
+                print(f'FAILED  {name}')
+                for label, expected, got in zip(['output', 'error', 'scope', 'arrays', 'maps'], reference, result):
+                    if expected != got:
+                        print(f'  {label}: expected {expected!r}, got {got!r}')
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,64 @@
+from typing import *
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import ipy
+
+
+def load(path:str, optimize:int=ipy.OPTIMIZE_NONE) -> ipy.IPYP:
+    '''
+    Compiles a benchmark program and runs its initial commands.
+    '''
+    with open(path, encoding='utf-8') as f:
+        ipyp = ipy.IPYP(f.read(), os.path.basename(path), [], optimize=optimize)
+    ipyp.size_update_callback = lambda: None
+    ipyp.run_code(ipyp.pre)
+    return ipyp
+
+
+def count_instructions(path:str, optimize:int=ipy.OPTIMIZE_NONE) -> int:
+    '''
+    Returns the number of instructions one frame of the program runs.
+    '''
+    ipyp = load(path, optimize)
+    counter: List[int] = [0]
+
+    def counted(handler:Callable) -> Callable:
+        def wrapper(i, frame):
+            counter[0] += 1
+            return handler(i, frame)
+        return wrapper
+
+    ipyp.handlers = [counted(handler) for handler in ipyp.handlers]
+    ipyp.run_code(ipyp.loop)
+    return counter[0]
+
+
+def measure(path:str, frames:int, repeats:int, optimize:int=ipy.OPTIMIZE_NONE) -> float:
+    '''
+    Returns the best time it took to run the given amount of frames.
+    '''
+    best: float = None
+    for _ in range(repeats):
+        ipyp = load(path, optimize)
+        start = time.perf_counter()
+        for _ in range(frames):
+            ipyp.step()
+        elapsed = time.perf_counter()-start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else\
+        os.path.join(os.path.dirname(__file__), 'programs', 'loop.ipyp')
+    optimize = int(sys.argv[2]) if len(sys.argv) > 2 else ipy.OPTIMIZE_NONE
+    frames = 20
+    instructions = count_instructions(path, optimize)
+    elapsed = measure(path, frames, 5, optimize)
+
+    print(f'{os.path.basename(path)} (optimization level {optimize}): {instructions} instructions per frame')
+    print(f'{frames/elapsed:.1f} frames/s, {instructions*frames/elapsed:,.0f} instructions/s')
@@ -0,0 +1,109 @@
+from typing import *
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import ipy
+import pygame as pg
+
+
+WARMUP = 20 # frames to run before measuring
+FRAMES = 200 # frames to measure allocations in
+GC_FRAMES = 2000 # frames to count garbage collections in
+
+
+def load(path:str) -> ipy.IPYP:
+    '''
+    Compiles a program and runs its initial commands on an offscreen surface.
+    '''
+    with open(path, encoding='utf-8') as f:
+        code = f.read()
+    ipyp = ipy.IPYP(code, os.path.basename(path), [])
+    ipyp.size_update_callback = lambda: None
+    ipyp.surface = pg.Surface((160, 120))
+    ipyp.execute(ipyp.pre)
+    return ipyp
+
+
+def compiled_size(path:str) -> int:
+    '''
+    Returns the amount of memory the compiled program takes.
+    '''
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ipyp = load(path)
+    size = tracemalloc.get_traced_memory()[0]-before
+    tracemalloc.stop()
+    return size
+
+
+def frame_allocations(path:str) -> Tuple[float, float]:
+    '''
+    Returns average memory allocated and freed during a frame
+    and average memory kept after a frame.
+    '''
+    ipyp = load(path)
+    for _ in range(WARMUP):
+        ipyp.step()
+
+    tracemalloc.start()
+    transient: int = 0
+    start = tracemalloc.get_traced_memory()[0]
+    for _ in range(FRAMES):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        ipyp.step()
+        transient += tracemalloc.get_traced_memory()[1]-before
+    kept = tracemalloc.get_traced_memory()[0]-start
+    tracemalloc.stop()
+
+    return transient/FRAMES, kept/FRAMES
+
+
+def collections(path:str) -> Tuple[int, float]:
+    '''
+    Returns the amount of garbage collections during GC_FRAMES frames
+    and the longest time a collection took in milliseconds.
+    '''
+    ipyp = load(path)
+    for _ in range(WARMUP):
+        ipyp.step()
+
+    count: List[int] = [0]
+    longest: List[float] = [0]
+    started: List[float] = [0]
+
+    def callback(phase:str, info:dict):
+        if phase == 'start':
+            started[0] = time.perf_counter()
+        else:
+            count[0] += 1
+            longest[0] = max(longest[0], time.perf_counter()-started[0])
+
+    gc.collect()
+    gc.callbacks.append(callback)
+    try:
+        for _ in range(GC_FRAMES):
+            ipyp.step()
+    finally:
+        gc.callbacks.remove(callback)
+
+    return count[0], longest[0]*1000
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else\
+        os.path.join(os.path.dirname(__file__), 'programs', 'game.ipyp')
+
+    size = compiled_size(path)
+    transient, kept = frame_allocations(path)
+    count, longest = collections(path)
+
+    print(f'{os.path.basename(path)}')
+    print(f'compiled program: {size/1024:.1f} KiB')
+    print(f'per frame: {transient/1024:.1f} KiB peak temporary memory, {kept:.0f} B kept')
+    print(f'{count} garbage collections in {GC_FRAMES} frames, longest {longest:.2f} ms')
@@ -0,0 +1,70 @@
+from typing import *
+import argparse
+import glob
+import json
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import ipy
+
+
+PROGRAMS = os.path.join(os.path.dirname(__file__), 'programs') # directory with benchmark programs
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json') # stored results of each backend
+FRAMES = 200 # frames to run each program for
+TOLERANCE = 0.25 # how much slower than the baseline a program can be
+CHECKED = ['p50_ms', 'p95_ms', 'update_ms', 'render_ms'] # timings compared to baselines, p99 is too noisy
+
+
+def compare(result:Dict[str, float], baseline:Dict[str, float]) -> List[str]:
+    '''
+    Returns descriptions of regressions of a result against its baseline.
+    '''
+    regressions: List[str] = []
+    if result['instructions'] > baseline['instructions']:
+        regressions.append(
+            f'instructions per frame went from {baseline["instructions"]:.0f} to {result["instructions"]:.0f}'
+        )
+    for key in CHECKED:
+        if result[key] > baseline[key]*(1+TOLERANCE):
+            regressions.append(f'{key} went from {baseline[key]:.3f} to {result[key]:.3f}')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Runs benchmark programs headless and compares them to baselines.')
+    parser.add_argument('--update', action='store_true', help='store the results as the new baselines')
+    parser.add_argument('--frames', type=int, default=FRAMES, help=f'frames to run each program for (default: {FRAMES})')
+    parser.add_argument('--backend', choices=ipy.BACKENDS, default=ipy.INTERPRETER)
+    args = parser.parse_args()
+
+    stored: Dict[str, Dict[str, Dict[str, float]]] = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES, encoding='utf-8') as f:
+            stored = json.load(f)
+    baselines: Dict[str, Dict[str, float]] = stored.get(args.backend, {})
+
+    # spritesheets are loaded relative to the programs
+    os.chdir(PROGRAMS)
+    results: Dict[str, Dict[str, float]] = {}
+    failed: int = 0
+    for path in sorted(glob.glob('*.ipyp')):
+        with open(path, encoding='utf-8') as f:
+            stats = ipy.run_headless(f.read(), path, args.frames, args.backend)
+        results[path] = stats.summary()
+        print(stats.report())
+
+        if not args.update and path in baselines:
+            for regression in compare(results[path], baselines[path]):
+                failed += 1
+                print(f'  REGRESSION: {regression}')
+
+    if args.update:
+        stored[args.backend] = results
+        with open(BASELINES, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, indent=4, sort_keys=True)
+            f.write('\n')
+        print(f'Baselines written to {BASELINES}')
+
+    sys.exit(1 if failed else 0)
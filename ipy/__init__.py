@@ -1,5 +1,12 @@
+from .arrays import *
+from .benchmark import *
 from .constants import *
 from .engine import *
 from .errors import *
 from .functions import *
-from .spritesheet import *
\ No newline at end of file
+from .maps import *
+from .objects import *
+from .spatial import *
+from .spritesheet import *
+from .tilemaps import *
+from .timing import *
\ No newline at end of file
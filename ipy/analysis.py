@@ -0,0 +1,380 @@
+from typing import *
+
+from .constants import *
+from .objects import *
+
+
+# commands that don't touch anything outside the function
+PURE_COMMANDS = [
+    OP_NOOP, OP_POINT, OP_GOTO, OP_BREAK, OP_RETURN, OP_CALL,
+    OP_IFEQUALS, OP_IFDIFF, OP_IFGREATER, OP_IFSMALLER
+]
+
+# commands that write to the variable in their first argument
+WRITE_COMMANDS = [
+    OP_ASSIGN, OP_ADD, OP_SUB, OP_MUL, OP_DIV,
+    OP_TOINT, OP_INVERT, OP_NOT, OP_TOSTRING
+]
+
+
+def walk_operands(operands:List[Operand]) -> Iterator[Operand]:
+    '''
+    Yields the operands and all arguments nested in function calls and map keys.
+    '''
+    for operand in operands:
+        yield operand
+        if isinstance(operand, Call):
+            yield from walk_operands(operand.args)
+        elif isinstance(operand, MapItem):
+            yield from walk_operands([operand.key])
+
+
+def read_operands(i:Instruction) -> List[Operand]:
+    '''
+    Returns the operands of an instruction that are evaluated as values.
+    '''
+    if i.opcode in [OP_POINT, OP_GOTO]:
+        return []
+    if i.opcode in [OP_CALL, OP_ASSIGN]:
+        return i.operands[1:]
+    return i.operands
+
+
+def called_functions(code:List[Instruction]) -> Set[str]:
+    '''
+    Returns names of all functions called in a block of code.
+    '''
+    names: Set[str] = set()
+    for i in code:
+        if i.opcode == OP_CALL and len(i.args) > 0:
+            names.add(i.args[0])
+        for operand in walk_operands(i.operands):
+            if isinstance(operand, Call):
+                names.add(operand.function)
+
+    return names
+
+
+def find_temporaries(code:List[Instruction], users:Dict[str, Set[int]], recursive:bool) -> Optional[Set[str]]:
+    '''
+    Checks if a function body only depends on its arguments. Returns
+    the names of global variables it uses as temporary values, or None
+    if the function is not pure.
+
+    Global variables are allowed as temporary values if no other block
+    uses them and the function assigns them before reading them.
+    Recursive functions can't write to any variables, since inner calls
+    would overwrite the values of the outer ones.
+    '''
+    private: Set[str] = set() # global variables used only as temporary values
+
+    for i in code:
+        if i.opcode not in PURE_COMMANDS and i.opcode not in WRITE_COMMANDS:
+            return None
+
+        # reading values
+        for operand in walk_operands(read_operands(i)):
+            if isinstance(operand, Reference) and operand.text not in private:
+                return None
+            if isinstance(operand, MapItem):
+                return None
+
+        # writing values
+        if i.opcode in WRITE_COMMANDS:
+            if recursive or len(i.operands) == 0 or not isinstance(i.operands[0], Reference):
+                return None
+            name: str = i.operands[0].text
+            if users.get(name) != {id(code)}:
+                return None
+            # the first write has to be an ASSIGN that can't be jumped over
+            if name not in private:
+                skipped = True in [
+                    j.jump is not None and j.jump > i.index for j in code[:i.index]
+                ]
+                if i.opcode != OP_ASSIGN or skipped:
+                    return None
+                private.add(name)
+
+    return private
+
+
+def find_pure_functions(functions:Dict[str, Function], blocks:List[List[Instruction]]):
+    '''
+    Sets `Function.pure` and `Function.temporaries` for every function.
+    A pure function only reads its arguments and calls other pure
+    functions, so its result can be cached.
+    '''
+    # finding blocks that use each variable
+    users: Dict[str, Set[int]] = {}
+    for code in blocks:
+        for i in code:
+            for operand in walk_operands(i.operands):
+                if isinstance(operand, Reference):
+                    users.setdefault(operand.text, set()).add(id(code))
+
+    # finding recursive functions
+    calls: Dict[str, Set[str]] = {name: called_functions(func.code) for name, func in functions.items()}
+    recursive: Dict[str, bool] = {}
+    for name in functions:
+        reached: Set[str] = set()
+        queue: List[str] = list(calls[name])
+        while queue:
+            callee = queue.pop()
+            if callee in reached or callee not in calls:
+                continue
+            reached.add(callee)
+            queue.extend(calls[callee])
+        recursive[name] = name in reached
+
+    for name, func in functions.items():
+        temporaries = find_temporaries(func.code, users, recursive[name])
+        func.pure = temporaries is not None
+        func.temporaries = temporaries or set()
+
+    # a function that calls an impure function is not pure either
+    changed = True
+    while changed:
+        changed = False
+        for name, func in functions.items():
+            if func.pure and True in [
+                callee not in functions or not functions[callee].pure for callee in calls[name]
+            ]:
+                func.pure = False
+                changed = True
+
+
+# argument kinds used in command signatures
+# value arguments are described by a list of allowed types or ANY
+ARG_NAME = 'name' # name of a variable or an array
+ARG_POINT = 'point' # name of a goto point
+ARG_FUNCTION = 'function' # name of a function
+ARG_TYPE = 'type' # element type of an array
+ARG_MAP_TYPE = 'map type' # key or value type of a map
+
+NUMBERS = [INTEGER, FLOAT]
+KEYS = [BOOL, INTEGER, FLOAT, STRING] # types that can be used as map keys
+IDS = [INTEGER, STRING] # types that can be used as entity ids in spatial hashes
+
+# arguments of every command and whether it takes any amount of extra values
+SIGNATURES: Dict[int, Tuple[list, bool]] = {
+    OP_NOOP: ([], True),
+    OP_LOG: ([], True),
+    OP_BREAK: ([], True),
+    OP_RETURN: ([ANY], False),
+    OP_POINT: ([ARG_POINT], False),
+    OP_GOTO: ([ARG_POINT], False),
+    OP_CALL: ([ARG_FUNCTION], True),
+    OP_ASSIGN: ([ARG_NAME, ANY], False),
+    OP_ARRAY: ([ARG_NAME, ARG_TYPE], False),
+    OP_APPEND: ([ARG_NAME, ANY], False),
+    OP_REMOVE: ([ARG_NAME, [INTEGER]], False),
+    OP_LENGTH: ([ARG_NAME, ARG_NAME], False),
+    OP_SPLIT: ([[STRING], ARG_NAME], False),
+    OP_INDEX: ([ARG_NAME, [INTEGER], ARG_NAME], False),
+    OP_ADD: ([ARG_NAME, NUMBERS], False),
+    OP_SUB: ([ARG_NAME, NUMBERS], False),
+    OP_MUL: ([ARG_NAME, NUMBERS], False),
+    OP_DIV: ([ARG_NAME, NUMBERS], False),
+    OP_TOINT: ([ARG_NAME], False),
+    OP_RNDINT: ([ARG_NAME, [INTEGER], [INTEGER]], False),
+    OP_NOT: ([ARG_NAME], False),
+    OP_INVERT: ([ARG_NAME], False),
+    OP_TOSTRING: ([ARG_NAME], False),
+    OP_IFEQUALS: ([ANY, ANY], False),
+    OP_IFDIFF: ([ANY, ANY], False),
+    OP_IFGREATER: ([NUMBERS, NUMBERS], False),
+    OP_IFSMALLER: ([NUMBERS, NUMBERS], False),
+    OP_SETRES: ([[INTEGER], [INTEGER]], False),
+    OP_SETFPS: ([[INTEGER]], False),
+    OP_LOADSHEET: ([[STRING]], False),
+    OP_FILL: ([[INTEGER], [INTEGER], [INTEGER]], False),
+    OP_DRAWSPRITE: ([[STRING], NUMBERS, NUMBERS, NUMBERS], False),
+    OP_ARRAYADD: ([ARG_NAME, NUMBERS], False),
+    OP_ARRAYMUL: ([ARG_NAME, NUMBERS], False),
+    OP_ARRAYFILL: ([ARG_NAME, ANY, [INTEGER]], False),
+    OP_ARRAYSUM: ([ARG_NAME, ARG_NAME], False),
+    OP_ARRAYMIN: ([ARG_NAME, ARG_NAME], False),
+    OP_ARRAYMAX: ([ARG_NAME, ARG_NAME], False),
+    OP_SORT: ([ARG_NAME], False),
+    OP_SWAPREMOVE: ([ARG_NAME, [INTEGER]], False),
+    OP_MAP: ([ARG_NAME, ARG_MAP_TYPE, ARG_MAP_TYPE], False),
+    OP_MAPSET: ([ARG_NAME, KEYS, ANY], False),
+    OP_MAPGET: ([ARG_NAME, KEYS, ARG_NAME, ANY], False),
+    OP_MAPHAS: ([ARG_NAME, KEYS, ARG_NAME], False),
+    OP_MAPDEL: ([ARG_NAME, KEYS], False),
+    OP_MAPSIZE: ([ARG_NAME, ARG_NAME], False),
+    OP_MAPKEYS: ([ARG_NAME, ARG_NAME], False),
+    OP_GETFPS: ([ARG_NAME], False),
+    OP_GETFRAMETIME: ([ARG_NAME], False),
+    OP_DRAWTRANSFORM: ([[STRING], NUMBERS, NUMBERS, NUMBERS, NUMBERS, [BOOL], [BOOL], NUMBERS], False),
+    OP_TILEMAP: ([ARG_NAME, [INTEGER], [INTEGER], [INTEGER], [INTEGER]], False),
+    OP_SETTILE: ([ARG_NAME, [INTEGER], [INTEGER], [STRING, NULL]], False),
+    OP_GETTILE: ([ARG_NAME, [INTEGER], [INTEGER], ARG_NAME], False),
+    OP_SETTILES: ([ARG_NAME, ARG_NAME, ARG_NAME], False),
+    OP_DRAWTILEMAP: ([ARG_NAME, NUMBERS, NUMBERS, NUMBERS], False),
+    OP_DRAWSPRITES: ([ANY, ARG_NAME, ARG_NAME, NUMBERS], False),
+    OP_SPATIAL: ([ARG_NAME, [INTEGER]], False),
+    OP_SPATIALADD: ([ARG_NAME, IDS, [STRING], NUMBERS, NUMBERS], False),
+    OP_SPATIALMOVE: ([ARG_NAME, IDS, NUMBERS, NUMBERS], False),
+    OP_SPATIALDEL: ([ARG_NAME, IDS], False),
+    OP_SPATIALQUERY: ([ARG_NAME, NUMBERS, NUMBERS, NUMBERS, NUMBERS, ARG_NAME], False),
+    OP_SPATIALHITS: ([ARG_NAME, IDS, ARG_NAME], False),
+    OP_SPATIALPAIRS: ([ARG_NAME, ARG_NAME, ARG_NAME], False)
+}
+
+# amount of arguments at the end of a signature that can be left out
+OPTIONAL_ARGUMENTS: Dict[int, int] = {
+    OP_ARRAY: 1,
+    OP_ARRAYFILL: 1,
+    OP_DRAWSPRITE: 1,
+    OP_MAP: 2,
+    OP_MAPGET: 1,
+    OP_DRAWTRANSFORM: 3,
+    OP_TILEMAP: 1,
+    OP_SETTILES: 1,
+    OP_DRAWTILEMAP: 1,
+    OP_DRAWSPRITES: 1,
+    OP_SPATIAL: 1
+}
+
+# element types that can be used in array declarations
+ARRAY_TYPE_NAMES: List[str] = ['INTEGER', 'FLOAT', 'BOOL']
+
+# key and value types that can be used in map declarations
+MAP_TYPE_NAMES: List[str] = ['ANY', 'BOOL', 'INTEGER', 'FLOAT', 'STRING']
+
+
+def keyword_error(text:str) -> Optional[str]:
+    '''
+    Returns an error message if the text can't be used as a keyword.
+    '''
+    if True in [i in FORBIDDEN_KEYWORD_CHARACTERS for i in text]:
+        return f'Keyword {text} must not contain any of the following characters: '\
+            +FORBIDDEN_KEYWORD_CHARACTERS
+    return None
+
+
+def check_value(operand:Operand, type:List[int], functions:Dict[str, Function]) -> List[str]:
+    '''
+    Checks the type of a literal and the function calls in a value argument.
+    '''
+    errors: List[str] = []
+
+    if isinstance(operand, Constant) and type != ANY and operand.type not in type:
+        errors.append(
+            f'Type {" or ".join([LIST_TYPES[t] for t in type])} required, '\
+                f'but found type {LIST_TYPES[operand.type]}'
+        )
+
+    if isinstance(operand, MapItem):
+        if keyword_error(operand.map):
+            errors.append(keyword_error(operand.map))
+        errors.extend(check_value(operand.key, KEYS, functions))
+
+    if isinstance(operand, Call):
+        if operand.function not in functions:
+            errors.append(f'Unknown function {operand.function}')
+            return errors
+        errors.extend(check_arguments(functions[operand.function], operand.args, functions))
+
+    return errors
+
+
+def check_arguments(func:Function, args:List[Operand], functions:Dict[str, Function]) -> List[str]:
+    '''
+    Checks the amount and the literal types of arguments passed to a function.
+    '''
+    if len(args) != len(func.types):
+        return [f'Function {func.name} requires exactly {len(func.types)} arguments']
+
+    errors: List[str] = []
+    for index, arg in enumerate(args):
+        if isinstance(arg, Constant) and func.types[index] != ANY and func.types[index] != arg.type:
+            errors.append(
+                f'Argument {func.params[index]} requires type {LIST_TYPES[func.types[index]]}, '\
+                    f'not {LIST_TYPES[arg.type]}'
+            )
+        else:
+            errors.extend(check_value(arg, ANY, functions))
+
+    return errors
+
+
+def validate_block(code:List[Instruction], functions:Dict[str, Function]) -> List[Tuple[int, str]]:
+    '''
+    Checks commands, amounts of arguments, keywords, literal types
+    and called functions in a block of code.
+
+    Returns a list of errors as tuples of line numbers and messages.
+    '''
+    errors: List[Tuple[int, str]] = []
+    points: Set[str] = {i.args[0] for i in code if i.opcode == OP_POINT and len(i.args) == 1}
+
+    for i in code:
+        if i.instruction in BLOCK_COMMANDS:
+            errors.append((i.line, f'Unexpected {i.instruction} command'))
+            continue
+        if i.opcode not in SIGNATURES:
+            errors.append((i.line, f'Unknown command {i.instruction}'))
+            continue
+
+        # amount of arguments
+        params, variadic = SIGNATURES[i.opcode]
+        optional: int = OPTIONAL_ARGUMENTS.get(i.opcode, 0)
+        if optional and not len(params)-optional <= len(i.args) <= len(params):
+            errors.append((
+                i.line, f'{i.instruction} requires from {len(params)-optional} to {len(params)} arguments'
+            ))
+            continue
+        if not variadic and not optional and len(i.args) != len(params):
+            s = '' if len(params) == 1 else 's'
+            errors.append((i.line, f'{i.instruction} requires exactly {len(params)} argument{s}'))
+            continue
+        if variadic and len(i.args) < len(params):
+            s = '' if len(params) == 1 else 's'
+            errors.append((i.line, f'{i.instruction} requires at least {len(params)} argument{s}'))
+            continue
+
+        # arguments
+        messages: List[str] = []
+        for index, operand in enumerate(i.operands):
+            kind = params[index] if index < len(params) else ANY
+
+            if kind == ARG_NAME:
+                if isnumber(operand.text):
+                    messages.append('Variable name must not be numeric')
+                elif keyword_error(operand.text):
+                    messages.append(keyword_error(operand.text))
+
+            elif kind == ARG_TYPE:
+                if operand.text.upper() not in ARRAY_TYPE_NAMES:
+                    messages.append(
+                        f'Unknown array type {operand.text}, expected one of: {", ".join(ARRAY_TYPE_NAMES)}'
+                    )
+
+            elif kind == ARG_MAP_TYPE:
+                if operand.text.upper() not in MAP_TYPE_NAMES:
+                    messages.append(
+                        f'Unknown map type {operand.text}, expected one of: {", ".join(MAP_TYPE_NAMES)}'
+                    )
+
+            elif kind == ARG_POINT:
+                if keyword_error(operand.text):
+                    messages.append(keyword_error(operand.text))
+                elif i.opcode == OP_GOTO and operand.text not in points:
+                    messages.append(f'Unknown GOTO point: {operand.text}')
+
+            elif kind == ARG_FUNCTION:
+                if keyword_error(operand.text):
+                    messages.append(keyword_error(operand.text))
+                elif operand.text not in functions:
+                    messages.append(f'Unknown function {operand.text}')
+                else:
+                    messages.extend(check_arguments(functions[operand.text], i.operands[1:], functions))
+
+            elif not (i.opcode == OP_CALL and index > 0):
+                messages.extend(check_value(operand, kind, functions))
+
+        errors.extend((i.line, message) for message in messages)
+
+    return errors
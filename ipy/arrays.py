@@ -0,0 +1,390 @@
+from typing import *
+import operator
+import numpy as np
+
+from .constants import *
+from .objects import *
+
+
+NUMBERS = [INTEGER, FLOAT]
+
+# element types of typed arrays and their storage types
+ARRAY_TYPES: Dict[int, type] = {
+    INTEGER: np.int64,
+    FLOAT: np.float64,
+    BOOL: np.bool_
+}
+
+INTEGER_LIMIT = 2**63 # INTEGER arrays store values from -INTEGER_LIMIT to INTEGER_LIMIT-1
+SAFE_LIMIT = 2**62 # results estimated below this can't overflow, even with float rounding
+
+
+def fits_int64(value:int) -> bool:
+    '''
+    Returns whether an integer can be stored in an INTEGER array.
+    '''
+    return -INTEGER_LIMIT <= value < INTEGER_LIMIT
+
+
+class Array(list):
+    '''
+    Array of variables of any type.
+
+    Elements are shared variables that are never changed in place,
+    so they can be read without copying. Methods raise `ValueError`
+    with a message for the user if the values can't be used.
+    '''
+    type: int = ANY # type of all elements
+
+    def item(self, index:int) -> Tuple[int, Any]:
+        '''
+        Returns the type and the value of an element.
+        '''
+        var: Variable = self[index]
+        return var.type, var.value
+
+
+    def swap_remove(self, index:int):
+        '''
+        Removes an element by moving the last element in its place.
+        '''
+        self[index] = self[-1]
+        self.pop()
+
+
+    def fill(self, variable:Variable, count:int=None):
+        '''
+        Sets all elements to a value. Resizes the array if `count` is given.
+        '''
+        self[:] = [shared_variable(variable.type, variable.value)]*(len(self) if count is None else count)
+
+
+    def numbers(self, action:str) -> List[Any]:
+        '''
+        Returns values of all elements, which have to be integers or floats.
+        '''
+        if True in [var.type not in NUMBERS for var in self]:
+            raise ValueError(f'{action} requires an array of integers or floats')
+        return [var.value for var in self]
+
+
+    def combine(self, other:Union[Variable, 'Array', 'TypedArray'], action:str, operation:Callable):
+        '''
+        Applies an operation to every element and a value or an element of another array.
+        '''
+        values: List[Any] = self.numbers(action)
+        types: List[int] = [var.type for var in self]
+        if isinstance(other, Variable):
+            if other.type not in NUMBERS:
+                raise ValueError(f'{action} requires an integer or a float')
+            others: List[Any] = [other.value]*len(self)
+            other_types: List[int] = [other.type]*len(self)
+        else:
+            if len(other) != len(self):
+                raise ValueError(f'{action} requires arrays of the same length')
+            other.numbers(action)
+            others = [var.value for var in other]
+            other_types = [var.type for var in other] if other.type == ANY else [other.type]*len(self)
+
+        self[:] = [
+            shared_variable(FLOAT if FLOAT in [a_type, b_type] else INTEGER, operation(a, b))
+                for a, a_type, b, b_type in zip(values, types, others, other_types)
+        ]
+
+
+    def add(self, other:Union[Variable, 'Array', 'TypedArray']):
+        '''
+        Adds a value or elements of another array to every element.
+        '''
+        self.combine(other, 'ARRAYADD', lambda a, b: a+b)
+
+
+    def mul(self, other:Union[Variable, 'Array', 'TypedArray']):
+        '''
+        Multiplies every element by a value or an element of another array.
+        '''
+        self.combine(other, 'ARRAYMUL', lambda a, b: a*b)
+
+
+    def sum(self) -> Variable:
+        '''
+        Returns the sum of all elements.
+        '''
+        values: List[Any] = self.numbers('ARRAYSUM')
+        type = FLOAT if True in [var.type == FLOAT for var in self] else INTEGER
+        return shared_variable(type, sum(values))
+
+
+    def extreme(self, action:str, function:Callable) -> Variable:
+        '''
+        Returns the smallest or the largest element.
+        '''
+        if len(self) == 0:
+            raise ValueError(f'{action} requires a non-empty array')
+        self.check_comparable(action)
+        return function(self, key=lambda var: var.value)
+
+
+    def check_comparable(self, action:str):
+        '''
+        Checks that all elements can be compared with each other.
+        '''
+        if True in [var.type not in NUMBERS for var in self]\
+            and True in [var.type != STRING for var in self]:
+            raise ValueError(f'{action} requires an array of numbers or an array of strings')
+
+
+    def min(self) -> Variable:
+        '''
+        Returns the smallest element.
+        '''
+        return self.extreme('ARRAYMIN', min)
+
+
+    def max(self) -> Variable:
+        '''
+        Returns the largest element.
+        '''
+        return self.extreme('ARRAYMAX', max)
+
+
+    def sort(self):
+        '''
+        Sorts elements in ascending order.
+        '''
+        self.check_comparable('SORT')
+        super().sort(key=lambda var: var.value)
+
+
+class TypedArray:
+    '''
+    Array of integers, floats or bools stored in a contiguous buffer.
+
+    Has the same methods as `Array`. Elements are converted to
+    variables when they are read.
+    '''
+    def __init__(self, type:int, capacity:int=8):
+        self.type: int = type # type of all elements
+        self.data: np.ndarray = np.zeros(max(capacity, 1), ARRAY_TYPES[type]) # buffer with free space at the end
+        self.length: int = 0 # amount of elements in the buffer
+
+
+    def values(self) -> np.ndarray:
+        '''
+        Returns a view of the used part of the buffer.
+        '''
+        return self.data[:self.length]
+
+
+    def reserve(self, capacity:int):
+        '''
+        Grows the buffer to fit at least the given amount of elements.
+        '''
+        if capacity > len(self.data):
+            data = np.zeros(max(capacity, len(self.data)*2), self.data.dtype)
+            data[:self.length] = self.values()
+            self.data = data
+
+
+    def convert(self, variable:Variable, action:str) -> Any:
+        '''
+        Returns a value that can be stored in the array.
+        Integers can be stored in float arrays.
+        '''
+        if self.type == INTEGER and variable.type == INTEGER and not fits_int64(variable.value):
+            raise ValueError(f'{action} requires a value that fits in 64 bits for INTEGER arrays')
+        if self.type == FLOAT and variable.type == INTEGER:
+            try:
+                return float(variable.value)
+            except OverflowError:
+                raise ValueError(f'{action} requires a value that fits in a FLOAT')
+        if variable.type == self.type:
+            return variable.value
+        raise ValueError(f'{action} requires a value of type {LIST_TYPES[self.type]} for this array')
+
+
+    def __len__(self) -> int:
+        return self.length
+
+
+    def __getitem__(self, index:int) -> Variable:
+        if index < 0:
+            index += self.length
+        return shared_variable(self.type, self.data[index].item())
+
+
+    def __iter__(self) -> Iterator[Variable]:
+        return (shared_variable(self.type, value) for value in self.values().tolist())
+
+
+    def item(self, index:int) -> Tuple[int, Any]:
+        '''
+        Returns the type and the value of an element.
+        '''
+        if index < 0:
+            index += self.length
+        return self.type, self.data[index].item()
+
+
+    def numbers(self, action:str) -> np.ndarray:
+        '''
+        Returns all elements, which have to be integers or floats.
+        '''
+        if self.type not in NUMBERS:
+            raise ValueError(f'{action} requires an array of integers or floats')
+        return self.values()
+
+
+    def append(self, variable:Variable):
+        '''
+        Adds an element to the end of the array.
+        '''
+        value = self.convert(variable, 'APPEND')
+        self.reserve(self.length+1)
+        self.data[self.length] = value
+        self.length += 1
+
+
+    def pop(self, index:int=-1):
+        '''
+        Removes an element and moves the next elements back.
+        '''
+        if index < 0:
+            index += self.length
+        self.data[index:self.length-1] = self.data[index+1:self.length]
+        self.length -= 1
+
+
+    def swap_remove(self, index:int):
+        '''
+        Removes an element by moving the last element in its place.
+        '''
+        self.data[index] = self.data[self.length-1]
+        self.length -= 1
+
+
+    def fill(self, variable:Variable, count:int=None):
+        '''
+        Sets all elements to a value. Resizes the array if `count` is given.
+        '''
+        value = self.convert(variable, 'ARRAYFILL')
+        if count is not None:
+            self.reserve(count)
+            self.length = count
+        self.values().fill(value)
+
+
+    def combine(
+        self, other:Union[Variable, Array, 'TypedArray'], action:str,
+        operation:Callable, exact:Callable[[Any, Any], Any]
+    ):
+        '''
+        Applies an operation to every element and a value or an element of another array.
+        `operation` is the numpy function and `exact` the same operation on
+        Python numbers, used for INTEGER arrays when results may not fit in 64 bits.
+        '''
+        values: np.ndarray = self.numbers(action)
+        if isinstance(other, Variable):
+            if other.type not in NUMBERS:
+                raise ValueError(f'{action} requires an integer or a float')
+            other_type: int = other.type
+            others: Any = other.value
+        else:
+            if len(other) != len(self):
+                raise ValueError(f'{action} requires arrays of the same length')
+            if other.type == ANY:
+                other_type = FLOAT if True in [var.type == FLOAT for var in other] else INTEGER
+            else:
+                other_type = other.type
+            others = other.numbers(action)
+
+        if self.type == INTEGER and other_type == FLOAT:
+            raise ValueError(f'{action} can\'t change an INTEGER array with floats')
+        if self.type == INTEGER:
+            self.combine_integers(values, others, action, operation, exact)
+            return
+        try:
+            others = np.asarray(others, np.float64)
+        except OverflowError:
+            raise ValueError(f'{action} requires values that fit in a FLOAT')
+        operation(values, others, out=values)
+
+
+    def combine_integers(
+        self, values:np.ndarray, others:Any, action:str,
+        operation:Callable, exact:Callable[[Any, Any], Any]
+    ):
+        '''
+        Applies an operation to INTEGER elements and raises an error instead
+        of wrapping around if a value or a result doesn't fit in 64 bits.
+        '''
+        if isinstance(others, int):
+            if not fits_int64(others):
+                raise ValueError(f'{action} requires a value that fits in 64 bits for INTEGER arrays')
+            others = [others]*len(values)
+        elif not isinstance(others, np.ndarray):
+            if False in [fits_int64(value) for value in others]:
+                raise ValueError(f'{action} requires values that fit in 64 bits for INTEGER arrays')
+        others = np.asarray(others, np.int64)
+
+        # estimating the size of the results with floats, so most operations stay in numpy
+        bound: np.ndarray = exact(np.abs(values.astype(np.float64)), np.abs(others.astype(np.float64)))
+        if len(values) == 0 or bound.max() < SAFE_LIMIT:
+            operation(values, others, out=values)
+            return
+
+        results: List[int] = [exact(a, b) for a, b in zip(values.tolist(), others.tolist())]
+        if False in [fits_int64(value) for value in results]:
+            raise ValueError(f'{action} result doesn\'t fit in 64 bits for INTEGER arrays')
+        values[:] = results
+
+
+    def add(self, other:Union[Variable, Array, 'TypedArray']):
+        '''
+        Adds a value or elements of another array to every element.
+        '''
+        self.combine(other, 'ARRAYADD', np.add, operator.add)
+
+
+    def mul(self, other:Union[Variable, Array, 'TypedArray']):
+        '''
+        Multiplies every element by a value or an element of another array.
+        '''
+        self.combine(other, 'ARRAYMUL', np.multiply, operator.mul)
+
+
+    def sum(self) -> Variable:
+        '''
+        Returns the sum of all elements.
+        '''
+        if self.type == BOOL:
+            return shared_variable(INTEGER, int(np.count_nonzero(self.values())))
+        # sums that may not fit in 64 bits are added as Python integers, like in untyped arrays
+        if self.type == INTEGER and np.abs(self.values().astype(np.float64)).sum() >= SAFE_LIMIT:
+            return shared_variable(INTEGER, sum(self.values().tolist()))
+        return shared_variable(self.type, self.values().sum().item())
+
+
+    def min(self) -> Variable:
+        '''
+        Returns the smallest element.
+        '''
+        if self.length == 0:
+            raise ValueError('ARRAYMIN requires a non-empty array')
+        return shared_variable(self.type, self.values().min().item())
+
+
+    def max(self) -> Variable:
+        '''
+        Returns the largest element.
+        '''
+        if self.length == 0:
+            raise ValueError('ARRAYMAX requires a non-empty array')
+        return shared_variable(self.type, self.values().max().item())
+
+
+    def sort(self):
+        '''
+        Sorts elements in ascending order.
+        '''
+        self.values().sort()
@@ -0,0 +1,105 @@
+from typing import *
+import random
+import time
+
+from .constants import *
+from .functions import TRANSFORM_CACHE_SIZE
+from .engine import IPYP, App
+
+
+PERCENTILES: List[int] = [50, 95, 99] # frame time percentiles shown in reports
+
+
+class FrameStats:
+    def __init__(self, name:str, update_times:List[float], render_times:List[float], instructions:float):
+        '''
+        Timings of frames run in headless mode, in seconds.
+        '''
+        self.name: str = name # project filename
+        self.update_times: List[float] = update_times # time the interpreter took for each frame
+        self.render_times: List[float] = render_times # time drawing to the window took for each frame
+        self.frame_times: List[float] = [a+b for a, b in zip(update_times, render_times)] # total time of each frame
+        self.instructions: float = instructions # average amount of commands run per frame
+
+
+    def percentile(self, percent:int) -> float:
+        '''
+        Returns the frame time that the given percent of frames are faster than.
+        '''
+        times: List[float] = sorted(self.frame_times)
+        return times[min(len(times)-1, len(times)*percent//100)]
+
+
+    def summary(self) -> Dict[str, float]:
+        '''
+        Returns the main numbers in milliseconds as a dictionary.
+        '''
+        summary: Dict[str, float] = {
+            f'p{percent}_ms': self.percentile(percent)*1000 for percent in PERCENTILES
+        }
+        summary['update_ms'] = sum(self.update_times)/len(self.update_times)*1000
+        summary['render_ms'] = sum(self.render_times)/len(self.render_times)*1000
+        summary['instructions'] = self.instructions
+        return summary
+
+
+    def report(self) -> str:
+        '''
+        Returns a human-readable report.
+        '''
+        summary = self.summary()
+        percentiles: str = ', '.join([f'p{percent} {summary[f"p{percent}_ms"]:.3f} ms' for percent in PERCENTILES])
+        total: float = summary['update_ms']+summary['render_ms']
+        return f'{self.name}: {len(self.frame_times)} frames\n'\
+            f'  frame time: {percentiles}\n'\
+            f'  interpreter {summary["update_ms"]:.3f} ms ({summary["update_ms"]/total*100:.0f}%), '\
+                f'render {summary["render_ms"]:.3f} ms per frame\n'\
+            f'  {self.instructions:.0f} instructions per frame'
+
+
+def run_headless(
+    code:str, filename:str, frames:int, backend:str=INTERPRETER,
+    optimize:int=OPTIMIZE_NONE, seed:int=0, memoize:int=0,
+    transform_cache:int=TRANSFORM_CACHE_SIZE
+) -> FrameStats:
+    '''
+    Runs the initial commands and the given amount of frames of a project
+    on an offscreen surface with the frame rate not limited.
+
+    Spritesheets are loaded from the current working directory. The random
+    generator is seeded, so the same frames run every time. Instructions are
+    counted in a separate profiled run, so counting doesn't affect the timings.
+    The other options are passed to `IPYP`, so the runs match the project
+    running in a window with the same options.
+    '''
+    # timing frames
+    random.seed(seed)
+    ipyp = IPYP(
+        code, filename, [], backend, memoize, optimize, transform_cache=transform_cache
+    )
+    app = App(ipyp, headless=True)
+    ipyp.execute(ipyp.pre)
+
+    update_times: List[float] = []
+    render_times: List[float] = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        ipyp.step()
+        middle = time.perf_counter()
+        app.render()
+        update_times.append(middle-start)
+        render_times.append(time.perf_counter()-middle)
+
+    # counting instructions
+    random.seed(seed)
+    counted = IPYP(
+        code, filename, [], backend, memoize, optimize, profile=True, transform_cache=transform_cache
+    )
+    App(counted, headless=True)
+    counted.execute(counted.pre)
+    before: int = sum([stats.hits for stats in counted.profiler.commands.values()])
+    for _ in range(frames):
+        counted.step()
+    after: int = sum([stats.hits for stats in counted.profiler.commands.values()])
+
+    return FrameStats(filename, update_times, render_times, (after-before)/max(frames, 1))
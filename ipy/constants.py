@@ -1,6 +1,8 @@
 from typing import *
 
-FORBIDDEN_KEYWORD_CHARACTERS: str = '"\'=,.$*#'
+ENGINE_VERSION: str = '3' # version of the compiled code format, change to invalidate cached code
+
+FORBIDDEN_KEYWORD_CHARACTERS: str = '"\'=,.$*#[]'
 
 ANY = None
 NULL = 0
@@ -24,4 +26,178 @@ LIST_TYPES = [
     'INTEGER',
     'FLOAT',
     'STRING'
-]
\ No newline at end of file
+]
+
+# opcodes
+OP_UNKNOWN = 0
+OP_NOOP = 1
+OP_LOOP = 2
+OP_ENDLOOP = 3
+OP_FUNCTION = 4
+OP_ENDFUNCTION = 5
+OP_ARGS = 6
+OP_ENDARGS = 7
+OP_LOG = 8
+OP_BREAK = 9
+OP_RETURN = 10
+OP_POINT = 11
+OP_GOTO = 12
+OP_CALL = 13
+OP_ASSIGN = 14
+OP_ARRAY = 15
+OP_APPEND = 16
+OP_REMOVE = 17
+OP_LENGTH = 18
+OP_SPLIT = 19
+OP_INDEX = 20
+OP_ADD = 21
+OP_SUB = 22
+OP_MUL = 23
+OP_DIV = 24
+OP_TOINT = 25
+OP_RNDINT = 26
+OP_NOT = 27
+OP_INVERT = 28
+OP_TOSTRING = 29
+OP_IFEQUALS = 30
+OP_IFDIFF = 31
+OP_IFGREATER = 32
+OP_IFSMALLER = 33
+OP_SETRES = 34
+OP_SETFPS = 35
+OP_LOADSHEET = 36
+OP_FILL = 37
+OP_DRAWSPRITE = 38
+OP_ARRAYADD = 39
+OP_ARRAYMUL = 40
+OP_ARRAYFILL = 41
+OP_ARRAYSUM = 42
+OP_ARRAYMIN = 43
+OP_ARRAYMAX = 44
+OP_SORT = 45
+OP_SWAPREMOVE = 46
+OP_MAP = 47
+OP_MAPSET = 48
+OP_MAPGET = 49
+OP_MAPHAS = 50
+OP_MAPDEL = 51
+OP_MAPSIZE = 52
+OP_MAPKEYS = 53
+OP_GETFPS = 54
+OP_GETFRAMETIME = 55
+OP_DRAWTRANSFORM = 56
+OP_TILEMAP = 57
+OP_SETTILE = 58
+OP_GETTILE = 59
+OP_SETTILES = 60
+OP_DRAWTILEMAP = 61
+OP_DRAWSPRITES = 62
+OP_SPATIAL = 63
+OP_SPATIALADD = 64
+OP_SPATIALMOVE = 65
+OP_SPATIALDEL = 66
+OP_SPATIALQUERY = 67
+OP_SPATIALHITS = 68
+OP_SPATIALPAIRS = 69
+
+OPCODES = {
+    'NOOP': OP_NOOP,
+    'LOOP': OP_LOOP,
+    'ENDLOOP': OP_ENDLOOP,
+    'FUNCTION': OP_FUNCTION,
+    'ENDFUNCTION': OP_ENDFUNCTION,
+    'ARGS': OP_ARGS,
+    'ENDARGS': OP_ENDARGS,
+    'LOG': OP_LOG,
+    'BREAK': OP_BREAK,
+    'RETURN': OP_RETURN,
+    'POINT': OP_POINT,
+    'GOTO': OP_GOTO,
+    'CALL': OP_CALL,
+    'ASSIGN': OP_ASSIGN,
+    'ARRAY': OP_ARRAY,
+    'APPEND': OP_APPEND,
+    'REMOVE': OP_REMOVE,
+    'LENGTH': OP_LENGTH,
+    'SPLIT': OP_SPLIT,
+    'INDEX': OP_INDEX,
+    'ADD': OP_ADD,
+    'SUB': OP_SUB,
+    'MUL': OP_MUL,
+    'DIV': OP_DIV,
+    'TOINT': OP_TOINT,
+    'RNDINT': OP_RNDINT,
+    'NOT': OP_NOT,
+    'INVERT': OP_INVERT,
+    'TOSTRING': OP_TOSTRING,
+    'IFEQUALS': OP_IFEQUALS,
+    'IFDIFF': OP_IFDIFF,
+    'IFGREATER': OP_IFGREATER,
+    'IFSMALLER': OP_IFSMALLER,
+    'SETRES': OP_SETRES,
+    'SETFPS': OP_SETFPS,
+    'LOADSHEET': OP_LOADSHEET,
+    'FILL': OP_FILL,
+    'DRAWSPRITE': OP_DRAWSPRITE,
+    'ARRAYADD': OP_ARRAYADD,
+    'ARRAYMUL': OP_ARRAYMUL,
+    'ARRAYFILL': OP_ARRAYFILL,
+    'ARRAYSUM': OP_ARRAYSUM,
+    'ARRAYMIN': OP_ARRAYMIN,
+    'ARRAYMAX': OP_ARRAYMAX,
+    'SORT': OP_SORT,
+    'SWAPREMOVE': OP_SWAPREMOVE,
+    'MAP': OP_MAP,
+    'MAPSET': OP_MAPSET,
+    'MAPGET': OP_MAPGET,
+    'MAPHAS': OP_MAPHAS,
+    'MAPDEL': OP_MAPDEL,
+    'MAPSIZE': OP_MAPSIZE,
+    'MAPKEYS': OP_MAPKEYS,
+    'GETFPS': OP_GETFPS,
+    'GETFRAMETIME': OP_GETFRAMETIME,
+    'DRAWTRANSFORM': OP_DRAWTRANSFORM,
+    'TILEMAP': OP_TILEMAP,
+    'SETTILE': OP_SETTILE,
+    'GETTILE': OP_GETTILE,
+    'SETTILES': OP_SETTILES,
+    'DRAWTILEMAP': OP_DRAWTILEMAP,
+    'DRAWSPRITES': OP_DRAWSPRITES,
+    'SPATIAL': OP_SPATIAL,
+    'SPATIALADD': OP_SPATIALADD,
+    'SPATIALMOVE': OP_SPATIALMOVE,
+    'SPATIALDEL': OP_SPATIALDEL,
+    'SPATIALQUERY': OP_SPATIALQUERY,
+    'SPATIALHITS': OP_SPATIALHITS,
+    'SPATIALPAIRS': OP_SPATIALPAIRS
+}
+
+# commands that only define blocks and can't be executed
+BLOCK_COMMANDS = ['LOOP', 'ENDLOOP', 'FUNCTION', 'ENDFUNCTION', 'ARGS', 'ENDARGS']
+
+STOP = -1 # returned by a command handler to finish the current block
+
+# execution backends
+INTERPRETER = 'interpreter'
+BYTECODE = 'bytecode'
+JIT = 'jit'
+
+BACKENDS = [INTERPRETER, BYTECODE, JIT]
+
+# optimization levels
+OPTIMIZE_NONE = 0 # code runs as written
+OPTIMIZE_SAFE = 1 # transformations that never change results
+OPTIMIZE_FULL = 2 # also merges additions, which may round floats differently
+
+OPTIMIZATION_LEVELS = [OPTIMIZE_NONE, OPTIMIZE_SAFE, OPTIMIZE_FULL]
+
+# dirty rectangles
+MAX_DIRTY_RECTS = 256 # amount of changed regions after which the whole surface is redrawn
+
+# stats overlay
+OVERLAY_KEY = 'f3' # name of the key that toggles the overlay
+OVERLAY_BAR = 2 # width of the bar of one frame in pixels
+OVERLAY_HEIGHT = 100 # height of the graph in pixels
+OVERLAY_SCALE = 3 # pixels per millisecond of frame time
+OVERLAY_LINE = 12 # height of a line of text in pixels
+OVERLAY_COLORS = [(120,120,255), (255,200,60), (80,220,120), (230,90,200), (140,140,140)] # color of each phase
@@ -1,11 +1,27 @@
 import pygame as pg
 from typing import *
+import gc
+import hashlib
+import math
+import os
+import pickle
 import random
 
 from .errors import *
-from .spritesheet import IPYS
+from .spritesheet import *
 from .functions import *
 from .constants import *
+from .objects import *
+from .arrays import *
+from .maps import *
+from .vm import VM
+from .jit import TraceCompiler
+from .analysis import find_pure_functions, keyword_error, validate_block
+from .optimizer import optimize
+from .profiler import Profiler
+from .spatial import *
+from .tilemaps import *
+from .timing import *
 
 # todo math library
 
@@ -16,35 +32,26 @@ class ExitCode:
         self.message: str = message
 
 
-class Variable:
-    def __init__(self, name:str, type:int, value:Any):
-        self.name: str = name
-        self.type: int = type
-        self.value: Any = value
-
-
-class Instruction:
-    def __init__(self, line:str, line_number:int=None):
-        self.orig_line: str = line
-        self.line: int = line_number
-        self.orig_instruction: str = line.split(' ')[0]
-        self.orig_args: str = ' '.join(line.split(' ')[1:])
-
-        self.instruction: str = self.orig_instruction.upper()
-        self.args: List[str] = split_args(self.orig_args)
-
-
-class Function:
-    def __init__(self, name: str, args: Dict[str,int], code:List[Instruction]):
-        self.name: str = name # function name
-        self.args: Dict[str,int] = args # arguments as dict with keys as names and values as types
-        self.code: List[Instruction] = code # list of instructions to execute
-
-
 class IPYP:
-    def __init__(self, code:str, filename:str, spritesheets:List[IPYS]=[]):
+    def __init__(
+        self, code:str, filename:str, spritesheets:List[IPYS]=[],
+        backend:str=INTERPRETER, memoize:int=0, optimize:int=OPTIMIZE_NONE, cache:str=None,
+        profile:bool=False, transform_cache:int=TRANSFORM_CACHE_SIZE
+    ):
         '''
         Project engine.
+
+        `backend` selects how the code is executed: `INTERPRETER` walks
+        the instructions, `BYTECODE` runs them on the register VM, `JIT`
+        compiles blocks that run often into Python functions.
+        `memoize` is the number of results of pure functions to cache
+        (0 disables caching). `optimize` is the optimization level of
+        the compiled code (see `ipy.optimizer`). `cache` is a directory
+        to store compiled code in, so it doesn't have to be compiled
+        again on the next launch (None disables caching). `profile`
+        enables collecting time spent in commands and functions
+        (see `ipy.profiler`). `transform_cache` is the memory in bytes
+        that scaled, rotated and flipped sprites can take.
         '''
         self.code: str = code # project source code
         self.compiled: List[Instruction] = [] # list of all compiled instructions
@@ -52,16 +59,70 @@ class IPYP:
         self.functions: Dict[str, Function] = {} # list of functions
         self.loop: List[Instruction] = [] # list of instructions to run every frame
 
-        self.arrays: Dict[str, List[Variable]] = {} # all arrays
+        self.arrays: Dict[str, Union[Array, TypedArray]] = {} # all arrays
+        self.maps: Dict[str, Map] = {} # all maps
+        self.tilemaps: Dict[str, Tilemap] = {} # all tilemaps
+        self.spatial_hashes: Dict[str, SpatialHash] = {} # all spatial hashes
         self.spritesheets: List[IPYS] = spritesheets # list of spritesheets
         self.sprites: Dict[str, pg.Surface] = {} # dict of sprites
+        self.transforms: LRUCache = LRUCache(transform_cache, surface_size) # transformed sprites and their offsets
+        self.draw_list: List[Tuple[pg.Surface, Tuple[float, float]]] = [] # sprites to draw at the end of the frame
+        self.draw_layers: List[float] = [] # layer of each sprite in the draw list
+        self.layered: bool = False # whether any sprite in the draw list has a layer
+        self.track_dirty: bool = False # whether to record changed regions of the surface
+        self.dirty: List[pg.Rect] = [] # regions of the surface changed since the last presented frame
+        self.redraw: bool = True # whether the whole surface changed since the last presented frame
+        self.drawn: List[pg.Rect] = [] # regions of sprites drawn since the last fill
+        self.fill_color: Tuple[int,int,int] = None # color of the last fill
         self.filename: str = filename # project filename
-        self.scope: Dict[str, Variable] = {} # all variables
+        self.scope: Scope = Scope() # all variables
+        self.variables: List[Variable] = self.scope.variables # all variables by slot index
+        self.frames: List[Frame] = [] # stack of called functions
         self.size_update_callback: Callable = None # callback when the size of the window is changed
         self.fps: int = 0 # current frame rate (unlimited by default)
+        self.timer: FrameTimer = FrameTimer() # timings of frames, filled by the app
         self.surface: pg.Surface = None # surface to draw things on
-
-        self.compile(self.code)
+        self.optimize: int = optimize # optimization level
+        self.removed: int = 0 # amount of instructions removed by the optimizer
+        self.memo: LRUCache = LRUCache(memoize) if memoize > 0 else None # cached results of pure functions
+        self.profiler: Profiler = Profiler(filename) if profile else None # collected time, None if disabled
+
+        # command handlers indexed by opcode
+        self.handlers: List[Callable] = [self.command_unknown]*(max(OPCODES.values())+1)
+        for name, opcode in OPCODES.items():
+            if name in BLOCK_COMMANDS:
+                self.handlers[opcode] = self.command_unexpected
+            else:
+                self.handlers[opcode] = getattr(self, f'command_{name.lower()}')
+
+        # timing everything through wrappers so running without a profiler costs nothing
+        if self.profiler is not None:
+            self.handlers = [self.profiler.wrap_handler(handler) for handler in self.handlers]
+            self.call: Callable = self.profiler.wrap_call(self.call)
+
+        if cache is None or not self.load_cache(cache):
+            self.compile(self.code)
+            if cache is not None:
+                self.save_cache(cache)
+
+        # choosing backend
+        if backend not in BACKENDS:
+            raise EngineException(f'Unknown backend {backend}', self.filename)
+        self.backend: str = backend
+        self.vm: VM = None # bytecode virtual machine
+        self.jit: TraceCompiler = None # compiler of blocks that run often
+        if backend == BYTECODE:
+            self.vm = VM(self)
+            self.execute: Callable = self.vm.run
+        elif backend == JIT:
+            self.jit = TraceCompiler(self)
+            self.execute: Callable = self.jit.run
+        else:
+            self.execute: Callable = self.run_code
+        if self.profiler is not None:
+            self.execute = self.profiler.wrap_execute(
+                self.execute, {id(self.pre): 'init', id(self.loop): 'loop'}
+            )
 
 
     def compile(self, code:str):
@@ -115,7 +176,7 @@ class IPYP:
 
             index += 1
 
-        self.pre = [Instruction(line[0], line[1]) for line in pre]
+        self.pre = self.build_block(pre)
 
         # loop commands
         index = 0
@@ -127,7 +188,7 @@ class IPYP:
 
             if commands[index] == 'ENDLOOP':
                 isloop = False
-                self.loop = [Instruction(line[0], line[1]) for line in loop]
+                self.loop = self.build_block(loop)
 
             if isloop:
                 if commands[index] != 'LOOP':
@@ -151,14 +212,12 @@ class IPYP:
                 if len(code[index].split(' ')) != 2:
                     raise EngineException(f'FUNCTION requires exactly 1 argument', self.filename, index+1)
                 name = code[index].split(' ')[1]
-                self.check_keyword(name)
+                self.check_keyword(name, index+1)
 
             if commands[index] == 'ENDFUNCTION':
                 isfunction = False
-                self.functions[name] = Function(
-                    name, args,
-                    [Instruction(line[0], line[1]) for line in function]
-                )
+                self.functions[name] = Function(name, args, [])
+                self.functions[name].code = self.build_block(function, self.functions[name].locals)
                 name = None
                 args: Dict[str, int] = {}
 
@@ -180,7 +239,7 @@ class IPYP:
                                 self.filename, index+1
                             )
                         
-                        self.check_keyword(arg_args[0])
+                        self.check_keyword(arg_args[0], index+1)
                         if arg_args[1].upper() not in TYPES:
                             raise EngineException(f'Unknown type {arg_args[1]}', self.filename, index+1)
                         args[arg_args[0]] = TYPES[arg_args[1].upper()]
@@ -190,6 +249,156 @@ class IPYP:
 
             index += 1
 
+        # checking all blocks before running anything
+        errors: List[Tuple[int, str]] = []
+        for block in self.blocks():
+            errors.extend(validate_block(block, self.functions))
+        if len(errors) == 1:
+            raise EngineException(errors[0][1], self.filename, errors[0][0])
+        if len(errors) > 1:
+            errors.sort(key=lambda error: error[0])
+            raise EngineException(
+                f'Found {len(errors)} errors:\n'+'\n'.join(
+                    [f'Command {line}: {message}' for line, message in errors]
+                ),
+                self.filename
+            )
+
+        for block in self.blocks():
+            self.resolve_jumps(block)
+            self.removed += optimize(block, self.optimize)
+        find_pure_functions(self.functions, self.blocks())
+
+
+    def blocks(self) -> List[List[Instruction]]:
+        '''
+        Returns all blocks of code in the project.
+        '''
+        return [self.pre, self.loop]+[i.code for i in self.functions.values()]
+
+
+    def cache_path(self, cache:str) -> str:
+        '''
+        Returns the path of the compiled code file in the cache directory.
+        '''
+        name: str = os.path.splitext(os.path.basename(self.filename))[0]
+        return os.path.join(cache, f'{name}.ipyc')
+
+
+    def cache_key(self) -> Tuple[str, str, int]:
+        '''
+        Returns the values a cached compiled code has to match to be used.
+        '''
+        digest: str = hashlib.sha256(self.code.encode('utf-8')).hexdigest()
+        return (ENGINE_VERSION, digest, self.optimize)
+
+
+    def load_cache(self, cache:str) -> bool:
+        '''
+        Loads compiled code from the cache directory.
+        Returns False if there is no cached code or it is outdated.
+        '''
+        # loading lots of small objects triggers the garbage collector many times
+        enabled: bool = gc.isenabled()
+        gc.disable()
+        try:
+            with open(self.cache_path(cache), 'rb') as f:
+                data: Dict[str, Any] = pickle.load(f)
+        except Exception:
+            return False
+        finally:
+            if enabled:
+                gc.enable()
+        if not isinstance(data, dict) or data.get('key') != self.cache_key():
+            return False
+
+        self.compiled = data['compiled']
+        self.pre = data['pre']
+        self.loop = data['loop']
+        self.functions = data['functions']
+        self.removed = data['removed']
+        for name in data['names']:
+            self.scope.slot(name)
+        return True
+
+
+    def save_cache(self, cache:str):
+        '''
+        Saves compiled code to the cache directory. Errors are ignored
+        since the code can always be compiled again.
+        '''
+        data: Dict[str, Any] = {
+            'key': self.cache_key(),
+            'compiled': self.compiled,
+            'pre': self.pre,
+            'loop': self.loop,
+            'functions': self.functions,
+            'removed': self.removed,
+            'names': self.scope.names
+        }
+        path: str = self.cache_path(cache)
+        try:
+            os.makedirs(cache, exist_ok=True)
+            # writing to a temporary file first so other processes never read a partial file
+            temp: str = f'{path}.{os.getpid()}.tmp'
+            with open(temp, 'wb') as f:
+                pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp, path)
+        except OSError:
+            pass
+
+
+    def build_block(self, lines:List[Tuple[str,int]], locals:Dict[str,int]={}) -> List[Instruction]:
+        '''
+        Converts a list of lines and their numbers to a block of instructions.
+
+        `locals` contains local slot indexes of function arguments with
+        keys as `*NAME` keywords.
+        '''
+        code: List[Instruction] = [Instruction(line, number) for line, number in lines]
+        for index, i in enumerate(code):
+            i.index = index
+            i.operands = [self.link_operand(operand, locals) for operand in i.operands]
+
+        return code
+
+
+    def resolve_jumps(self, code:List[Instruction]):
+        '''
+        Stores the index of the command to jump to in every GOTO and IF command.
+        '''
+        # finding goto points
+        points: Dict[str, List[int]] = {} # indexes of goto points with keys as names
+        for i in code:
+            if i.opcode == OP_POINT:
+                points.setdefault(i.args[0], []).append(i.index)
+
+        for i in code:
+            # goto jumps right after the nearest point above it or the first one below it
+            if i.opcode == OP_GOTO:
+                above = [index for index in points[i.args[0]] if index < i.index]
+                i.jump = (above[-1] if above else points[i.args[0]][0])+1
+
+            # conditions skip the next command
+            elif i.opcode in [OP_IFEQUALS, OP_IFDIFF, OP_IFGREATER, OP_IFSMALLER]:
+                i.jump = i.index+2
+
+
+    def link_operand(self, operand:Operand, locals:Dict[str,int]={}) -> Operand:
+        '''
+        Assigns variable slots to an operand and its nested arguments.
+        Returns a `Local` operand for references to function arguments.
+        '''
+        if isinstance(operand, Reference) and operand.text in locals:
+            operand = Local(operand.text, locals[operand.text])
+        operand.slot = self.scope.slot(operand.text)
+        if isinstance(operand, Call):
+            operand.args = [self.link_operand(arg, locals) for arg in operand.args]
+        elif isinstance(operand, MapItem):
+            operand.key = self.link_operand(operand.key, locals)
+
+        return operand
+
 
     def load_spritesheet(self, filename: str):
         '''
@@ -198,10 +407,15 @@ class IPYP:
         try:
             with open(filename, encoding='utf-8') as f:
                 spritesheet = IPYS(f.read(), filename)
+                if pg.display.get_surface() is not None:
+                    spritesheet.convert_surfaces()
                 self.spritesheets.append(spritesheet)
 
                 for i in spritesheet.surfaces:
                     self.sprites[i] = spritesheet.surfaces[i]
+                self.transforms.clear()
+                for tilemap in self.tilemaps.values():
+                    tilemap.invalidate()
 
         except FileNotFoundError:
             raise EngineException(f"File {filename} not found in current working directory", self.filename)
@@ -209,6 +423,17 @@ class IPYP:
             raise EngineException(f"Could not load spritesheet: {e}", self.filename)
 
 
+    def convert_sprites(self):
+        '''
+        Converts all loaded sprites to the pixel format of the display.
+        '''
+        for i in self.sprites:
+            self.sprites[i] = convert_surface(self.sprites[i])
+        self.transforms.clear()
+        for tilemap in self.tilemaps.values():
+            tilemap.invalidate()
+
+
     def edit_window_size(self, sizex:int, sizey:int):
         '''
         Edits window size data and calls the callback.
@@ -232,26 +457,38 @@ class IPYP:
             raise EngineException(f'Unknown function {function}', self.filename)
         func: Function = self.functions[function]
 
-        if len(args) != len(func.args):
-            raise EngineException(f'Function {function} requires exactly {len(func.args)} arguments', self.filename)
-        
-        flat_args = [(i, func.args[i]) for i in func.args]
+        if len(args) != len(func.types):
+            raise EngineException(f'Function {function} requires exactly {len(func.types)} arguments', self.filename)
 
-        for index, i in enumerate(args):
-            if flat_args[index][1] != ANY and flat_args[index][1] != i.type:
+        # copying arguments to the local slots of a new frame
+        frame: Frame = Frame(func)
+        for index, var in enumerate(args):
+            if func.types[index] != ANY and func.types[index] != var.type:
                 raise EngineException(
-                    f'Argument {flat_args[index][0]} requires type {flat_args[index][1]}, not {i.type}',
+                    f'Argument {func.params[index]} requires type {LIST_TYPES[func.types[index]]}, '\
+                        f'not {LIST_TYPES[var.type]}',
                     self.filename
                 )
+            frame.locals.append(shared_variable(var.type, var.value))
 
-        [self.set_variable(f'*{i}', str(args[index].value), force=True) for index, i in enumerate(func.args)]
-        variable: Variable = self.run_code(func.code)
-        # cleaning up
-        for i in [f'*{var}' for var in func.args]:
-            if i in self.scope:
-                del self.scope[i]
+        # results of pure functions depend only on the arguments
+        key: Tuple = None
+        if func.pure and self.memo is not None:
+            key = (function, tuple((var.type, var.value) for var in frame.locals))
+            result: Variable = self.memo.get(key)
+            if result is not None:
+                return result
 
-        return variable
+        self.frames.append(frame)
+        try:
+            result: Variable = self.execute(func.code, frame)
+        finally:
+            self.frames.pop()
+
+        if key is not None and result is not None:
+            result = shared_variable(result.type, result.value)
+            self.memo.put(key, result)
+        return result
 
 
     def get_variable(self, name:str, type:int=ANY) -> Any:
@@ -272,99 +509,48 @@ class IPYP:
         return var.value
     
 
-    def check_keyword(self, text:str):
+    def check_keyword(self, text:str, line:int=None):
         '''
         Checks if using a keyword as an argument is fine.
         '''
-        if True in [i in FORBIDDEN_KEYWORD_CHARACTERS for i in text]:
-            raise EngineException(
-                f'Keyword {text} must not contain any of the following characters: '\
-                    +FORBIDDEN_KEYWORD_CHARACTERS,
-                self.filename
-            )
+        error: Optional[str] = keyword_error(text)
+        if error:
+            raise EngineException(error, self.filename, line)
     
 
-    def get_component(self, value:str, type:List[int]=ANY):
+    def get_operand(self, operand:Operand, type:List[int]=ANY) -> Variable:
         '''
-        Returns a `Variable` object from a command argument.
+        Evaluates a pre-parsed command argument and checks its type.
         '''
-        # null type
-        if value.upper() == NULL or value == 'NULL':
-            if type != ANY and NULL not in type:
-                raise EngineException(f'Type {" or ".join(type)} required, but found type null', self.filename)
-            return Variable(value, NULL, None)
-        
-        # bool
-        elif value.upper() in ['TRUE','FALSE']:
-            if type != ANY and BOOL not in type:
-                raise EngineException(f'Type {" or ".join(type)} required, but found type bool', self.filename)
-            return Variable(value, BOOL, value.upper()=='TRUE')
-        
-        # integer
-        elif isint(value):
-            if type != ANY and INTEGER not in type:
-                raise EngineException(f'Type {" or ".join(type)} required, but found type integer', self.filename)
-            return Variable(value, INTEGER, int(value))
-        
-        # float
-        elif isnumber(value):
-            if type != ANY and FLOAT not in type:
-                raise EngineException(f'Type {" or ".join(type)} required, but found type float', self.filename)
-            return Variable(value, FLOAT, float(value))
-        
-        # string
-        elif value.startswith('"') and value.endswith('"'):
-            if type != ANY and STRING not in type:
-                raise EngineException(f'Type {" or ".join(type)} required, but found type string', self.filename)
-            return Variable(value, STRING, value[1:-1])
-        
-        # function
-        elif value.startswith('$') and value.endswith('$'):
-            value = value[1:-1].split(' ')
-            variable: Variable = self.call(value[0], [self.get_component(i) for i in value[1:]])
-            if type != ANY and variable.type not in type:
-                raise EngineException(f'Type {" or ".join(type)} required, but found type {variable.type}', self.filename)
-            return variable
-        
-        # another variable
-        elif value in self.scope:
-            if type != ANY and self.scope[value].type not in type:
-                raise EngineException(
-                    f'Type {" or ".join([LIST_TYPES[t] for t in type])} required, '\
-                        f'but found type {LIST_TYPES[self.scope[value].type]}', self.filename
-                )
-            return self.scope[value]
-        
-        # error
-        else:
+        variable: Variable = operand.get(self)
+        if type != ANY and variable.type not in type:
             raise EngineException(
-                f'Unknown keyword {value} or such variable does not exist',
-                self.filename
+                f'Type {" or ".join([LIST_TYPES[t] for t in type])} required, '\
+                    f'but found type {LIST_TYPES[variable.type]}', self.filename
             )
+        return variable
+
+
+    def get_component(self, value:str, type:List[int]=ANY) -> Variable:
+        '''
+        Returns a `Variable` object from a command argument.
+        '''
+        return self.get_operand(self.link_operand(parse_operand(value)), type)
         
 
     def to_string(self, variable:Variable) -> Variable:
         '''
         Converts an expression to string.
         '''
-        match variable.type:
-            case 0:
-                return Variable(variable.name, STRING, 'NULL')
-            
-            case 1:
-                return Variable(variable.name, STRING, 'TRUE' if variable.value else 'FALSE')
-            
-            case 2|3:
-                return Variable(variable.name, STRING, str(variable.value))
-            
-            case 4:
-                return variable
-            
-            case _:
-                return Variable(variable.name, STRING, 'NULL')
+        if variable.type == STRING:
+            return variable
+        return Variable(variable.name, STRING, string_value(variable))
         
     
-    def set_variable(self, name:str, value:str, force:bool=False):
+    def set_variable(self, name:str, value:Union[str,Operand,Variable], force:bool=False):
+        '''
+        Checks the variable name and copies the value into the variable.
+        '''
         # checking name
         if isnumber(name):
             raise EngineException('Variable name must not be numeric', self.filename)
@@ -376,12 +562,30 @@ class IPYP:
                 self.filename
             )
         # getting value
-        value = self.get_component(value)
+        if isinstance(value, str):
+            value = self.link_operand(parse_operand(value))
+        if isinstance(value, Operand):
+            value = self.get_operand(value)
         # adding variable
-        self.scope[name] = value
+        self.assign(self.scope.slot(name), value.type, value.value)
+
+
+    def assign(self, slot:int, type:int, value:Any):
+        '''
+        Writes a value into a variable slot.
 
+        Existing variables are updated in place, so a variable is never
+        shared between two slots or with an array.
+        '''
+        variable: Variable = self.variables[slot]
+        if variable is None:
+            self.variables[slot] = Variable(self.scope.names[slot], type, value)
+        else:
+            variable.type = type
+            variable.value = value
 
-    def create_array(self, name:str):
+
+    def create_array(self, name:str, type:int=ANY):
         # checking name
         if True in [i in name for i in FORBIDDEN_KEYWORD_CHARACTERS]:
             raise EngineException(
@@ -390,448 +594,1283 @@ class IPYP:
                 self.filename
             )
         # creating array
-        self.arrays[name] = []
+        self.arrays[name] = Array() if type == ANY else TypedArray(type)
+
+
+    def get_array(self, name:str, line:int=None) -> Union[Array, TypedArray]:
+        '''
+        Returns an array by name. Otherwise, throws exception.
+        '''
+        if name not in self.arrays:
+            raise EngineException(f'Unknown array {name}', self.filename, line)
+        return self.arrays[name]
+
+
+    def get_array_operand(self, operand:Operand, line:int=None) -> Union[Array, TypedArray, Variable]:
+        '''
+        Returns the array named by a command argument or the value
+        of the argument if there is no such array.
+        '''
+        if isinstance(operand, Reference) and operand.text in self.arrays:
+            return self.arrays[operand.text]
+        return self.get_operand(operand, [INTEGER,FLOAT])
+
+
+
+    def create_map(self, name:str, key_type:int=ANY, value_type:int=ANY):
+        # checking name
+        if True in [i in name for i in FORBIDDEN_KEYWORD_CHARACTERS]:
+            raise EngineException(
+                f'Map name must not contain any of the following characters: '\
+                    +FORBIDDEN_KEYWORD_CHARACTERS,
+                self.filename
+            )
+        # creating map
+        self.maps[name] = Map(key_type, value_type)
+
+
+    def get_map(self, name:str, line:int=None) -> Map:
+        '''
+        Returns a map by name. Otherwise, throws exception.
+        '''
+        if name not in self.maps:
+            raise EngineException(f'Unknown map {name}', self.filename, line)
+        return self.maps[name]
+
+
+    def get_map_item(self, name:str, key:Variable, line:int=None) -> Variable:
+        '''
+        Returns the value stored in a map under a key. Otherwise, throws exception.
+        '''
+        map = self.get_map(name, line)
+        try:
+            value = map.lookup(key, 'Map lookup')
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, line)
+        if value is None:
+            raise EngineException(f'Key {string_value(key)} not found in map {name}', self.filename, line)
+        return value
+
+
+    def create_tilemap(self, name:str, width:int, height:int, tile_width:int, tile_height:int, line:int=None):
+        # checking name
+        if True in [i in name for i in FORBIDDEN_KEYWORD_CHARACTERS]:
+            raise EngineException(
+                f'Tilemap name must not contain any of the following characters: '\
+                    +FORBIDDEN_KEYWORD_CHARACTERS,
+                self.filename
+            )
+        # creating tilemap
+        try:
+            self.tilemaps[name] = Tilemap(width, height, tile_width, tile_height)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, line)
+
+
+    def get_tilemap(self, name:str, line:int=None) -> Tilemap:
+        '''
+        Returns a tilemap by name. Otherwise, throws exception.
+        '''
+        if name not in self.tilemaps:
+            raise EngineException(f'Unknown tilemap {name}', self.filename, line)
+        return self.tilemaps[name]
+
+
+    def create_spatial_hash(self, name:str, cell_size:int=CELL_SIZE, line:int=None):
+        # checking name
+        if True in [i in name for i in FORBIDDEN_KEYWORD_CHARACTERS]:
+            raise EngineException(
+                f'Spatial hash name must not contain any of the following characters: '\
+                    +FORBIDDEN_KEYWORD_CHARACTERS,
+                self.filename
+            )
+        # creating spatial hash
+        try:
+            self.spatial_hashes[name] = SpatialHash(cell_size)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, line)
+
+
+    def get_spatial_hash(self, name:str, line:int=None) -> SpatialHash:
+        '''
+        Returns a spatial hash by name. Otherwise, throws exception.
+        '''
+        if name not in self.spatial_hashes:
+            raise EngineException(f'Unknown spatial hash {name}', self.filename, line)
+        return self.spatial_hashes[name]
 
          
-    def run_code(self, code: List[Instruction]) -> Variable:
+    def run_code(self, code: List[Instruction], frame:Frame=None) -> Variable:
         '''
-        Runs inputted code with goto points in local scope.
+        Runs inputted code.
         '''
         if len(code) == 0:
-            return
+            return RETURN_NULL
         
-        goto_indexes: Dict[str, int] = {} # dict with keys as names and values as line numbers
+        if frame is None:
+            frame = Frame() # state of the running block
+        handlers: List[Callable] = self.handlers
         index: int = 0 # current line index
-        finished: bool = False
+        length: int = len(code)
         # running code
-        while not finished:
+        while index < length:
             i = code[index]
-            args = i.args
+            jump = handlers[i.opcode](i, frame)
 
-            # operations
-            match i.instruction:
-                # noop
-                case 'NOOP':
-                    continue
+            # next command
+            if jump is None:
+                index += 1
+            # finish execution
+            elif jump == STOP:
+                return frame.value
+            # jump to another command
+            else:
+                index = jump
 
-                # if there is an unexpected LOOP or ENDLOOP command
-                case 'LOOP'|'ENDLOOP'|'FUNCTION'|'ENDFUNCTION'|'ARGS'|'ENDARGS':
-                    raise EngineException(f'Unexpected {i.instruction} command', self.filename, i.line)
-                
-                # printing in console
-                case 'LOG':
-                    string: str = " ".join([str(self.get_component(var).value) for var in args])
-                    print(string)
-
-                # finish execution of current block
-                case 'BREAK':
-                    finished = True
-                    break
-
-                # returning value
-                case 'RETURN':
-                    if len(args) != 1:
-                        raise EngineException(f'RETURN requires exactly 1 argument', self.filename, i.line)
-                    finished = True
-                    return self.get_component(args[0])
-
-                # create goto point
-                case 'POINT':
-                    if len(args) != 1:
-                        raise EngineException(f'POINT requires exactly 1 argument', self.filename, i.line)
-                    self.check_keyword(args[0])
-                    goto_indexes[args[0]] = int(index)
-
-                # goto command
-                case 'GOTO':
-                    if len(args) != 1:
-                        raise EngineException(f'GOTO requires exactly 1 argument', self.filename, i.line)
-                    if args[0] not in goto_indexes:
-                        raise EngineException(f'Unknown GOTO point: {args[0]}', self.filename, i.line)
-                    index = goto_indexes[args[0]]
-                    continue
+        return RETURN_NULL
 
-                # function calling
-                case 'CALL':
-                    if len(args) < 1:
-                        raise EngineException(f'CALL requires at least 1 argument', self.filename, i.line)
-                    self.check_keyword(args[0])
-                    self.call(args[0], [self.get_component(arg) for arg in args[1:]])
 
-                
-                # variable management
-
-                # assign a value to a global variable
-                case 'ASSIGN':
-                    if len(args) != 2:
-                        raise EngineException(f'ASSIGN requires exactly 2 arguments', self.filename, i.line)
-                    self.check_keyword(args[0])
-                    self.set_variable(args[0], args[1])
-
-
-                # arrays
-
-                # create a new array
-                case 'ARRAY':
-                    if len(args) != 1:
-                        raise EngineException(f'ASSIGN requires exactly 1 argument', self.filename, i.line)
-                    self.check_keyword(args[0])
-                    self.create_array(args[0])
-
-                # append an element to the end of the array
-                case 'APPEND':
-                    if len(args) != 2:
-                        raise EngineException(f'APPEND requires exactly 2 arguments', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    if args[0] not in self.arrays:
-                        raise EngineException(f'Unknown array {args[0]}', self.filename, i.line)
-                    var = self.get_component(args[1])
-                    self.arrays[args[0]].append(var)
-
-                # remove an element from the array by index
-                case 'REMOVE':
-                    if len(args) != 2:
-                        raise EngineException(f'REMOVE requires exactly 2 arguments', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    if args[0] not in self.arrays:
-                        raise EngineException(f'Unknown array {args[0]}', self.filename, i.line)
-                    
-                    ind = self.get_component(args[1], [INTEGER]).value
-                    if ind >= len(self.arrays[args[0]]) or ind < 0:
-                        raise EngineException(
-                            f'Index {ind} in array {args[0]} out of bounds', self.filename, i.line
-                        )
-                    self.arrays[args[0]].pop(ind)
-
-                # create a new array
-                case 'LENGTH':
-                    if len(args) != 2:
-                        raise EngineException(f'LENGTH requires exactly 2 arguments', self.filename, i.line)
-                    self.check_keyword(args[0])
-                    self.check_keyword(args[1])
-                    if args[0] not in self.arrays:
-                        raise EngineException(f'Unknown array {args[0]}', self.filename, i.line)
-                    self.set_variable(args[1], str(len(self.arrays[args[0]])))
-
-                # create a new array
-                case 'SPLIT':
-                    if len(args) != 2:
-                        raise EngineException(f'SPLIT requires exactly 2 arguments', self.filename, i.line)
-                    string = self.get_component(args[0], [STRING]).value
-                    self.check_keyword(args[1])
-                    self.arrays[args[1]] = [Variable(str(ind), STRING, i) for ind, i in enumerate(list(string))]
-
-                # write the element from the array to a variable
-                case 'INDEX':
-                    if len(args) != 3:
-                        raise EngineException(f'INDEX requires exactly 3 arguments', self.filename, i.line)
-                    
-                    if args[0] not in self.arrays:
-                        raise EngineException(f'Unknown array {args[0]}', self.filename, i.line)
-                    ind = self.get_component(args[1], [INTEGER]).value
-                    self.check_keyword(args[2])
-                    
-                    if ind >= len(self.arrays[args[0]]) or ind < 0:
-                        raise EngineException(
-                            f'Index {ind} in array {args[0]} out of bounds', self.filename, i.line
-                        )
-                    
-                    self.scope[args[2]] = self.arrays[args[0]][ind]
-
-
-                # math
-
-                # add a value to a variable
-                case 'ADD':
-                    if len(args) != 2:
-                        raise EngineException(f'ADD requires exactly 2 arguments', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    var = self.get_component(args[1], type=[INTEGER,FLOAT])
-                    if args[0] not in self.scope:
-                        raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
-                    
-                    self.set_variable(args[0], str(self.scope[args[0]].value+var.value))
-
-                # substract a value from a variable
-                case 'SUB':
-                    if len(args) != 2:
-                        raise EngineException(f'SUB requires exactly 2 arguments', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    var = self.get_component(args[1], type=[INTEGER,FLOAT])
-                    if args[0] not in self.scope:
-                        raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
-                    
-                    self.set_variable(args[0], str(self.scope[args[0]].value-var.value))
-
-                # multiply a variable by a value
-                case 'MUL':
-                    if len(args) != 2:
-                        raise EngineException(f'MUL requires exactly 2 arguments', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    var = self.get_component(args[1], type=[INTEGER,FLOAT])
-                    if args[0] not in self.scope:
-                        raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
-                    
-                    self.set_variable(args[0], str(self.scope[args[0]].value*var.value))
-
-                # divide a variable by a value
-                case 'DIV':
-                    if len(args) != 2:
-                        raise EngineException(f'DIV requires exactly 2 arguments', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    var = self.get_component(args[1], type=[INTEGER,FLOAT])
-                    if args[0] not in self.scope:
-                        raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
-                
-                    self.set_variable(args[0], str(self.scope[args[0]].value/var.value))
-
-                # convert a variable to an integer
-                case 'TOINT':
-                    if len(args) != 1:
-                        raise EngineException(f'TOINT requires exactly 1 argument', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    if args[0] not in self.scope:
-                        raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
-                    if self.scope[args[0]].type not in [INTEGER,FLOAT]:
-                        raise EngineException(f'TOINT requires an integer or a float', self.filename, i.line)
-                
-                    self.set_variable(args[0], str(int(self.scope[args[0]].value)))
-
-                # generate a random integer in range
-                case 'RNDINT':
-                    if len(args) != 3:
-                        raise EngineException(f'RNDINT requires exactly 3 arguments', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    btm = self.get_component(args[1], type=[INTEGER]).value
-                    top = self.get_component(args[2], type=[INTEGER]).value
-                    param = sorted([btm,top])
-                
-                    self.set_variable(args[0], str(random.randint(*param)))
-
-
-                # variable management
-
-                # invert a boolean variable
-                case 'NOT':
-                    if len(args) != 1:
-                        raise EngineException(f'NOT requires exactly 1 argument', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    if args[0] not in self.scope:
-                        raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
-                    if self.scope[args[0]].type != BOOL:
-                        raise EngineException(f'NOT requires a bool variable', self.filename, i.line)
-
-                    self.scope[args[0]].value = not self.scope[args[0]].value
-
-                # invert a sign in a variable
-                case 'INVERT':
-                    if len(args) != 1:
-                        raise EngineException(f'INVERT requires exactly 1 argument', self.filename, i.line)
-                    
-                    self.check_keyword(args[0])
-                    if args[0] not in self.scope:
-                        raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
-                    if self.scope[args[0]].type not in [INTEGER,FLOAT]:
-                        raise EngineException(f'INVERT requires an integer or a float', self.filename, i.line)
-
-                    self.scope[args[0]].value = -self.scope[args[0]].value
-
-                # split a string into an array of characters
-                case 'SPLIT':
-                    if len(args) != 2:
-                        raise EngineException(f'SPLIT requires exactly 2 arguments', self.filename, i.line)
-                    string = self.get_component(args[0], [STRING]).value
-                    self.check_keyword(args[1])
-                    self.arrays[args[1]] = [Variable(str(ind), STRING, i) for ind, i in enumerate(list(string))]
-
-                # convert a variable to string in place
-                case 'TOSTRING':
-                    if len(args) != 1:
-                        raise EngineException(f'TOSTRING requires exactly 1 argument', self.filename, i.line)
-                    self.check_keyword(args[0])
-                    if args[0] not in self.scope:
-                        raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
-                    string = self.to_string(self.scope[args[0]])
-                    self.scope[args[0]] = string
-
-
-                # logic
-                    
-                # if the variable equals to another run the next line
-                case 'IFEQUALS':
-                    if len(args) != 2:
-                        raise EngineException(f'IFEQUALS requires exactly 2 arguments', self.filename, i.line)
-                    var1 = self.get_component(args[0]).value
-                    var2 = self.get_component(args[1]).value
-                    
-                    if not(var1 == var2):
-                        index += 1
-                    
-                # if the variable doesn't equal to another run the next line
-                case 'IFDIFF':
-                    if len(args) != 2:
-                        raise EngineException(f'IFDIFF requires exactly 2 arguments', self.filename, i.line)
-                    var1 = self.get_component(args[0]).value
-                    var2 = self.get_component(args[1]).value
-                    
-                    if not(var1 != var2):
-                        index += 1
-                    
-                # if the variable is greater than another run the next line
-                case 'IFGREATER':
-                    if len(args) != 2:
-                        raise EngineException(f'IFGREATER requires exactly 2 arguments', self.filename, i.line)
-                    var1 = self.get_component(args[0], [INTEGER,FLOAT]).value
-                    var2 = self.get_component(args[1], [INTEGER,FLOAT]).value
-                    
-                    if not(var1 > var2):
-                        index += 1
-                    
-                # if the variable is smaller than another run the next line
-                case 'IFSMALLER':
-                    if len(args) != 2:
-                        raise EngineException(f'IFSMALLER requires exactly 2 arguments', self.filename, i.line)
-                    var1 = self.get_component(args[0], [INTEGER,FLOAT]).value
-                    var2 = self.get_component(args[1], [INTEGER,FLOAT]).value
-                    
-                    if not(var1 < var2):
-                        index += 1
-
-
-                # window management
-
-                # set window resolution
-                case 'SETRES':
-                    if len(args) != 2:
-                        raise EngineException(f'SETRES requires exactly 2 arguments', self.filename, i.line)
-                    x = self.get_component(args[0], type=[INTEGER]).value
-                    y = self.get_component(args[1], type=[INTEGER]).value
-                    if x <= 0 or y <= 0:
-                        raise EngineException(f'Window size must be greater than 0', self.filename, i.line)
-                    self.edit_window_size(x, y)
-
-                # set window fps
-                case 'SETFPS':
-                    if len(args) != 1:
-                        raise EngineException(f'SETRES requires exactly 1 argument', self.filename, i.line)
-                    fps = self.get_component(args[0], type=[INTEGER]).value
-                    if fps < 0:
-                        raise EngineException(f'Target FPS must be greater than or equal to zero', self.filename, i.line)
-                    self.fps = fps
-                    
-                # load spritesheet from a file
-                case 'LOADSHEET':
-                    if len(args) != 1:
-                        raise EngineException(f'LOADSHEET requires exactly 1 argument', self.filename, i.line)
-                    filename = self.get_component(args[0], type=[STRING]).value
-                    self.load_spritesheet(filename)
-                    
-                # fill window with color and cover everything
-                case 'FILL':
-                    if len(args) != 3:
-                        raise EngineException(f'FILL requires exactly 3 arguments', self.filename, i.line)
-                    r = self.get_component(args[0], type=[INTEGER]).value
-                    g = self.get_component(args[1], type=[INTEGER]).value
-                    b = self.get_component(args[2], type=[INTEGER]).value
-                    if (r < 0 or r > 255) or (g < 0 or g > 255) or (b < 0 or b > 255):
-                        raise EngineException(f'Color value must be from 0 to 255', self.filename, i.line)
-                    self.surface.fill((r,g,b))
-                    
-                # draw sprite on top of everything
-                case 'DRAWSPRITE':
-                    if len(args) != 3:
-                        raise EngineException(f'DRAWSPRITE requires exactly 3 arguments', self.filename, i.line)
-                    sprite = self.get_component(args[0], type=[STRING]).value
-                    x = self.get_component(args[1], type=[INTEGER,FLOAT]).value
-                    y = self.get_component(args[2], type=[INTEGER,FLOAT]).value
-                    if sprite not in self.sprites:
-                        raise EngineException(f'Sprite {sprite} not found', self.filename, i.line)
-                    self.surface.blit(self.sprites[sprite], (x, y))
-
-                # unknown command
-                case _:
-                    raise EngineException(f'Unknown command {i.instruction}', self.filename, i.line)
-                
-            # next command
-            index += 1
-            if index >= len(code):
-                finished = True
-                break
+    # command handlers
+    # each handler returns None to run the next command, an index
+    # of the command to jump to or STOP to finish the block
 
-        return Variable('*RETURN_VALUE', NULL, None)
+    def command_unknown(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Raises an error on commands that do not exist.
+        '''
+        raise EngineException(f'Unknown command {i.instruction}', self.filename, i.line)
 
 
-    def step(self):
+    def command_noop(self, i:Instruction, frame:Frame) -> Optional[int]:
         '''
-        Runs game cycle.
+        Does nothing.
         '''
-        self.run_code(self.loop)
+        pass
 
 
-class App:
-    def __init__(self, ipyp: IPYP):
-        self.windowsize: Tuple[int,int] = (640,480)
-        self.scalesize: Tuple[int,int] = [640,480]
-        self.ipyp: IPYP = ipyp
-        self.ipyp.size_update_callback = self.update_size
+    def command_unexpected(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Raises an error on block commands found outside of their place.
+        '''
+        raise EngineException(f'Unexpected {i.instruction} command', self.filename, i.line)
 
-        self.running: bool = True
-        self.window = pg.display.set_mode(self.windowsize)
-        self.clock = pg.Clock()
-        self.ipyp.surface = None
 
-    def update_size(self):
+    def command_log(self, i:Instruction, frame:Frame) -> Optional[int]:
         '''
-        Updates the values of how the window is supposed to be
-        resized.
+        Prints the arguments in console.
         '''
-        # calculating the size of the screen
-        if self.windowsize[0]/self.ipyp.ratio[0] > self.windowsize[1]/self.ipyp.ratio[1]:
-            self.scalesize[0] = self.windowsize[1]/self.ipyp.ratio[1]*self.ipyp.ratio[0]
-            self.scalesize[1] = self.windowsize[1]
+        string: str = " ".join([str(self.get_operand(var).value) for var in i.operands])
+        print(string)
 
-        elif self.windowsize[1]/self.ipyp.ratio[1] > self.windowsize[0]/self.ipyp.ratio[0]:
-            self.scalesize[0] = self.windowsize[0]
-            self.scalesize[1] = self.windowsize[0]/self.ipyp.ratio[0]*self.ipyp.ratio[1]
-            
-        else:
-            self.scalesize[0] = self.windowsize[0]
-            self.scalesize[1] = self.windowsize[1]
 
-        # updating rect of the screen
-        self.windowrect = pg.Rect((0,0),self.scalesize)
-        self.windowrect.center = (self.windowsize[0]/2, self.windowsize[1]/2)
-        self.window = pg.display.set_mode(self.windowsize, pg.RESIZABLE)
+    def command_break(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Finishes execution of current block.
+        '''
+        frame.value = RETURN_NULL
+        return STOP
 
-        # updating game surface
-        self.ipyp.surface = pg.Surface(self.ipyp.size)
 
-    def run(self):
+    def command_return(self, i:Instruction, frame:Frame) -> Optional[int]:
         '''
-        Runs the game loop.
+        Returns a value from current block.
         '''
-        self.ipyp.run_code(self.ipyp.pre)
+        frame.value = self.get_operand(i.operands[0])
+        return STOP
 
-        while self.running:
-            for event in pg.event.get():
-                if event.type == pg.QUIT:
-                    self.running = False
-                if event.type == pg.VIDEORESIZE:
-                    self.windowsize = (event.w, event.h)
-                    self.update_size()
 
-            self.window.fill((0,0,0))            
-            self.ipyp.step()
-            surface = pg.transform.scale(self.ipyp.surface, self.scalesize)
-            self.window.blit(surface, self.windowrect)
-            pg.display.update()
+    def command_point(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Marks a goto point. Points are resolved when the code is compiled.
+        '''
+        pass
+
+
+    def command_goto(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Goes to a goto point.
+        '''
+        return i.jump
+
+
+    def command_call(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Calls a function.
+        '''
+        self.call(i.args[0], [self.get_operand(arg) for arg in i.operands[1:]])
+
+
+    # variable management
+
+    def command_assign(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Assigns a value to a global variable.
+        '''
+        value = self.get_operand(i.operands[1])
+        self.assign(i.operands[0].slot, value.type, value.value)
+
+
+    # arrays
+
+    def command_array(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Creates a new array.
+        '''
+        args = i.args
+        self.create_array(args[0], TYPES[args[1].upper()] if len(args) > 1 else ANY)
+
+
+    def command_append(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Appends an element to the end of the array.
+        '''
+        args = i.args
+        if args[0] not in self.arrays:
+            raise EngineException(f'Unknown array {args[0]}', self.filename, i.line)
+        var = self.get_operand(i.operands[1])
+        try:
+            self.arrays[args[0]].append(shared_variable(var.type, var.value))
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_remove(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Removes an element from the array by index.
+        '''
+        args = i.args
+        if args[0] not in self.arrays:
+            raise EngineException(f'Unknown array {args[0]}', self.filename, i.line)
+        
+        ind = self.get_operand(i.operands[1], [INTEGER]).value
+        if ind >= len(self.arrays[args[0]]) or ind < 0:
+            raise EngineException(
+                f'Index {ind} in array {args[0]} out of bounds', self.filename, i.line
+            )
+        self.arrays[args[0]].pop(ind)
+
+
+    def command_length(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the length of the array into a variable.
+        '''
+        args = i.args
+        if args[0] not in self.arrays:
+            raise EngineException(f'Unknown array {args[0]}', self.filename, i.line)
+        self.assign(i.operands[1].slot, INTEGER, len(self.arrays[args[0]]))
+
+
+    def command_split(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Splits a string into an array of characters.
+        '''
+        args = i.args
+        string = self.get_operand(i.operands[0], [STRING]).value
+        self.arrays[args[1]] = Array([shared_variable(STRING, char) for char in string])
+
+
+    def command_index(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Writes the element from the array to a variable.
+        '''
+        args = i.args
+        if args[0] not in self.arrays:
+            raise EngineException(f'Unknown array {args[0]}', self.filename, i.line)
+        ind = self.get_operand(i.operands[1], [INTEGER]).value
+        
+        if ind >= len(self.arrays[args[0]]) or ind < 0:
+            raise EngineException(
+                f'Index {ind} in array {args[0]} out of bounds', self.filename, i.line
+            )
+        
+        type, value = self.arrays[args[0]].item(ind)
+        self.assign(i.operands[2].slot, type, value)
+
+
+    def command_arrayadd(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Adds a value or elements of another array to every element of the array.
+        '''
+        array = self.get_array(i.args[0], i.line)
+        other = self.get_array_operand(i.operands[1], i.line)
+        try:
+            array.add(other)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_arraymul(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Multiplies every element of the array by a value or an element of another array.
+        '''
+        array = self.get_array(i.args[0], i.line)
+        other = self.get_array_operand(i.operands[1], i.line)
+        try:
+            array.mul(other)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_arrayfill(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Sets every element of the array to a value, optionally resizing the array.
+        '''
+        array = self.get_array(i.args[0], i.line)
+        var = self.get_operand(i.operands[1])
+        count = None
+        if len(i.operands) > 2:
+            count = self.get_operand(i.operands[2], [INTEGER]).value
+            if count < 0:
+                raise EngineException(f'Array size must not be negative', self.filename, i.line)
+        try:
+            array.fill(var, count)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_arraysum(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the sum of all elements of the array into a variable.
+        '''
+        array = self.get_array(i.args[0], i.line)
+        try:
+            var = array.sum()
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+        self.assign(i.operands[1].slot, var.type, var.value)
+
+
+    def command_arraymin(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the smallest element of the array into a variable.
+        '''
+        array = self.get_array(i.args[0], i.line)
+        try:
+            var = array.min()
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+        self.assign(i.operands[1].slot, var.type, var.value)
+
+
+    def command_arraymax(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the largest element of the array into a variable.
+        '''
+        array = self.get_array(i.args[0], i.line)
+        try:
+            var = array.max()
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+        self.assign(i.operands[1].slot, var.type, var.value)
+
+
+    def command_sort(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Sorts the array in ascending order.
+        '''
+        array = self.get_array(i.args[0], i.line)
+        try:
+            array.sort()
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_swapremove(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Removes an element from the array by index, moving the last element in its place.
+        '''
+        array = self.get_array(i.args[0], i.line)
+        ind = self.get_operand(i.operands[1], [INTEGER]).value
+        if ind >= len(array) or ind < 0:
+            raise EngineException(
+                f'Index {ind} in array {i.args[0]} out of bounds', self.filename, i.line
+            )
+        array.swap_remove(ind)
+
+
+    # maps
+
+    def command_map(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Creates a new map.
+        '''
+        types = [TYPES[arg.upper()] for arg in i.args[1:]]
+        self.create_map(i.args[0], *types)
+
+
+    def command_mapset(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Stores a value in the map under a key.
+        '''
+        map = self.get_map(i.args[0], i.line)
+        key = self.get_operand(i.operands[1])
+        value = self.get_operand(i.operands[2])
+        try:
+            map.set(key, value)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_mapget(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Writes the value stored in the map under a key to a variable.
+        Writes the default value if there is no such key and a default is given.
+        '''
+        key = self.get_operand(i.operands[1])
+        if len(i.operands) > 3:
+            try:
+                value = self.get_map(i.args[0], i.line).lookup(key, 'MAPGET')
+            except ValueError as e:
+                raise EngineException(str(e), self.filename, i.line)
+            if value is None:
+                value = self.get_operand(i.operands[3])
+        else:
+            value = self.get_map_item(i.args[0], key, i.line)
+        self.assign(i.operands[2].slot, value.type, value.value)
+
+
+    def command_maphas(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts TRUE into a variable if the map has a key, FALSE otherwise.
+        '''
+        map = self.get_map(i.args[0], i.line)
+        key = self.get_operand(i.operands[1])
+        try:
+            found = map.lookup(key, 'MAPHAS') is not None
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+        self.assign(i.operands[2].slot, BOOL, found)
+
+
+    def command_mapdel(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Removes a key and its value from the map.
+        '''
+        map = self.get_map(i.args[0], i.line)
+        key = self.get_operand(i.operands[1])
+        try:
+            stored = map.key(key, 'MAPDEL')
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+        if stored not in map:
+            raise EngineException(
+                f'Key {string_value(key)} not found in map {i.args[0]}', self.filename, i.line
+            )
+        del map[stored]
+
+
+    def command_mapsize(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the amount of keys in the map into a variable.
+        '''
+        map = self.get_map(i.args[0], i.line)
+        self.assign(i.operands[1].slot, INTEGER, len(map))
+
+
+    def command_mapkeys(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts all keys of the map into an array.
+        '''
+        map = self.get_map(i.args[0], i.line)
+        try:
+            self.arrays[i.args[1]] = map.keys_array()
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    # tilemaps
+
+    def command_tilemap(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Creates a new tilemap with all tiles empty.
+        '''
+        width = self.get_operand(i.operands[1], type=[INTEGER]).value
+        height = self.get_operand(i.operands[2], type=[INTEGER]).value
+        tile_width = self.get_operand(i.operands[3], type=[INTEGER]).value
+        tile_height = tile_width
+        if len(i.operands) > 4:
+            tile_height = self.get_operand(i.operands[4], type=[INTEGER]).value
+        self.create_tilemap(i.args[0], width, height, tile_width, tile_height, i.line)
+
+
+    def command_settile(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Changes a tile of the tilemap. NULL clears it.
+        '''
+        tilemap = self.get_tilemap(i.args[0], i.line)
+        x = self.get_operand(i.operands[1], type=[INTEGER]).value
+        y = self.get_operand(i.operands[2], type=[INTEGER]).value
+        sprite = self.get_operand(i.operands[3], type=[STRING, NULL]).value
+        try:
+            tilemap.set(x, y, sprite)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_gettile(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the sprite name of a tile into a variable, NULL if it is empty.
+        '''
+        tilemap = self.get_tilemap(i.args[0], i.line)
+        x = self.get_operand(i.operands[1], type=[INTEGER]).value
+        y = self.get_operand(i.operands[2], type=[INTEGER]).value
+        try:
+            sprite = tilemap.get(x, y)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+        if sprite is None:
+            self.assign(i.operands[3].slot, NULL, None)
+        else:
+            self.assign(i.operands[3].slot, STRING, sprite)
+
+
+    def command_settiles(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Sets all tiles of the tilemap from an array, row by row.
+        The array contains sprite names or, if an array of names is given,
+        indexes into it with negative indexes for empty tiles.
+        '''
+        tilemap = self.get_tilemap(i.args[0], i.line)
+        tiles = self.get_array(i.args[1], i.line)
+        names = self.get_array(i.args[2], i.line) if len(i.args) > 2 else None
+        if len(tiles) != tilemap.width*tilemap.height:
+            raise EngineException(
+                f'SETTILES requires an array of {tilemap.width*tilemap.height} tiles', self.filename, i.line
+            )
+
+        sprites: List[Optional[str]] = []
+        for index in range(len(tiles)):
+            type, value = tiles.item(index)
+            if names is not None:
+                if type != INTEGER or value >= len(names):
+                    raise EngineException(
+                        f'SETTILES requires indexes smaller than {len(names)}', self.filename, i.line
+                    )
+                if value < 0:
+                    sprites.append(None)
+                    continue
+                type, value = names.item(value)
+            if type not in [STRING, NULL]:
+                raise EngineException('SETTILES requires sprite names or NULL', self.filename, i.line)
+            sprites.append(value)
+
+        for index, sprite in enumerate(sprites):
+            tilemap.set(index%tilemap.width, index//tilemap.width, sprite)
+
+
+    def command_drawtilemap(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Queues the visible chunks of the tilemap to be drawn at the end of the frame.
+        '''
+        tilemap = self.get_tilemap(i.args[0], i.line)
+        x = self.get_operand(i.operands[1], type=[INTEGER,FLOAT]).value
+        y = self.get_operand(i.operands[2], type=[INTEGER,FLOAT]).value
+        layer = 0
+        if len(i.operands) > 3:
+            layer = self.get_operand(i.operands[3], type=[INTEGER,FLOAT]).value
+            self.layered = True
+        try:
+            chunks = tilemap.visible(x, y, self.surface.get_rect(), self.sprites)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+        self.draw_list.extend(chunks)
+        self.draw_layers.extend([layer]*len(chunks))
+
+
+    # spatial hashes
+
+    def command_spatial(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Creates a new spatial hash.
+        '''
+        cell_size = CELL_SIZE
+        if len(i.operands) > 1:
+            cell_size = self.get_operand(i.operands[1], type=[INTEGER]).value
+        self.create_spatial_hash(i.args[0], cell_size, i.line)
+
+
+    def command_spatialadd(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Adds an entity with the size of a sprite to the spatial hash.
+        Replaces the entity if it already exists.
+        '''
+        index = self.get_spatial_hash(i.args[0], i.line)
+        id = self.get_operand(i.operands[1])
+        sprite = self.get_operand(i.operands[2], type=[STRING]).value
+        x = self.get_operand(i.operands[3], type=[INTEGER,FLOAT]).value
+        y = self.get_operand(i.operands[4], type=[INTEGER,FLOAT]).value
+        if sprite not in self.sprites:
+            raise EngineException(f'Sprite {sprite} not found', self.filename, i.line)
+        width, height = self.sprites[sprite].get_size()
+        try:
+            index.insert(index.key(id, 'SPATIALADD'), (x, y, width, height))
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_spatialmove(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Moves an entity of the spatial hash.
+        '''
+        index = self.get_spatial_hash(i.args[0], i.line)
+        id = self.get_operand(i.operands[1])
+        x = self.get_operand(i.operands[2], type=[INTEGER,FLOAT]).value
+        y = self.get_operand(i.operands[3], type=[INTEGER,FLOAT]).value
+        try:
+            index.move(index.key(id, 'SPATIALMOVE'), x, y)
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_spatialdel(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Removes an entity from the spatial hash.
+        '''
+        index = self.get_spatial_hash(i.args[0], i.line)
+        id = self.get_operand(i.operands[1])
+        try:
+            index.remove(index.key(id, 'SPATIALDEL'))
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_spatialquery(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the ids of all entities overlapping a rectangle into an array.
+        '''
+        index = self.get_spatial_hash(i.args[0], i.line)
+        rect = tuple([self.get_operand(operand, type=[INTEGER,FLOAT]).value for operand in i.operands[1:5]])
+        try:
+            self.arrays[i.args[5]] = index.ids_array(index.query(rect))
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+
+
+    def command_spatialhits(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the ids of all other entities overlapping an entity into an array.
+        '''
+        index = self.get_spatial_hash(i.args[0], i.line)
+        id = self.get_operand(i.operands[1])
+        try:
+            hits = index.hits(index.key(id, 'SPATIALHITS'))
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+        self.arrays[i.args[2]] = index.ids_array(hits)
+
+
+    def command_spatialpairs(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the ids of every pair of overlapping entities into two arrays.
+        '''
+        index = self.get_spatial_hash(i.args[0], i.line)
+        pairs = index.pairs()
+        self.arrays[i.args[1]] = index.ids_array([a for a, b in pairs])
+        self.arrays[i.args[2]] = index.ids_array([b for a, b in pairs])
+
+
+    # math
+
+    def command_add(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Adds a value to a variable.
+        '''
+        args = i.args
+        value = self.get_operand(i.operands[1], type=[INTEGER,FLOAT])
+        var = self.variables[i.operands[0].slot]
+        if var is None:
+            raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
+        if var.type not in [INTEGER,FLOAT]:
+            raise EngineException(f'ADD requires an integer or a float', self.filename, i.line)
+
+        var.value += value.value
+        var.type = FLOAT if var.type == FLOAT or value.type == FLOAT else INTEGER
+
+
+    def command_sub(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Substracts a value from a variable.
+        '''
+        args = i.args
+        value = self.get_operand(i.operands[1], type=[INTEGER,FLOAT])
+        var = self.variables[i.operands[0].slot]
+        if var is None:
+            raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
+        if var.type not in [INTEGER,FLOAT]:
+            raise EngineException(f'SUB requires an integer or a float', self.filename, i.line)
+
+        var.value -= value.value
+        var.type = FLOAT if var.type == FLOAT or value.type == FLOAT else INTEGER
+
+
+    def command_mul(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Multiplies a variable by a value.
+        '''
+        args = i.args
+        value = self.get_operand(i.operands[1], type=[INTEGER,FLOAT])
+        var = self.variables[i.operands[0].slot]
+        if var is None:
+            raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
+        if var.type not in [INTEGER,FLOAT]:
+            raise EngineException(f'MUL requires an integer or a float', self.filename, i.line)
+
+        var.value *= value.value
+        var.type = FLOAT if var.type == FLOAT or value.type == FLOAT else INTEGER
+
+
+    def command_div(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Divides a variable by a value.
+        '''
+        args = i.args
+        value = self.get_operand(i.operands[1], type=[INTEGER,FLOAT])
+        var = self.variables[i.operands[0].slot]
+        if var is None:
+            raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
+        if var.type not in [INTEGER,FLOAT]:
+            raise EngineException(f'DIV requires an integer or a float', self.filename, i.line)
+
+        var.value /= value.value
+        var.type = FLOAT
+
+
+    def command_toint(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Converts a variable to an integer.
+        '''
+        args = i.args
+        if self.variables[i.operands[0].slot] is None:
+            raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
+        if self.variables[i.operands[0].slot].type not in [INTEGER,FLOAT]:
+            raise EngineException(f'TOINT requires an integer or a float', self.filename, i.line)
+
+        var = self.variables[i.operands[0].slot]
+        var.value = int(var.value)
+        var.type = INTEGER
+
+
+    def command_rndint(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Generates a random integer in range.
+        '''
+        btm = self.get_operand(i.operands[1], type=[INTEGER]).value
+        top = self.get_operand(i.operands[2], type=[INTEGER]).value
+        param = sorted([btm,top])
+
+        self.assign(i.operands[0].slot, INTEGER, random.randint(*param))
+
+
+    # variables
+
+    def command_not(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Inverts a boolean variable.
+        '''
+        args = i.args
+        if self.variables[i.operands[0].slot] is None:
+            raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
+        if self.variables[i.operands[0].slot].type != BOOL:
+            raise EngineException(f'NOT requires a bool variable', self.filename, i.line)
+
+        self.variables[i.operands[0].slot].value = not self.variables[i.operands[0].slot].value
+
+
+    def command_invert(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Inverts a sign in a variable.
+        '''
+        args = i.args
+        if self.variables[i.operands[0].slot] is None:
+            raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
+        if self.variables[i.operands[0].slot].type not in [INTEGER,FLOAT]:
+            raise EngineException(f'INVERT requires an integer or a float', self.filename, i.line)
+
+        self.variables[i.operands[0].slot].value = -self.variables[i.operands[0].slot].value
+
+
+    def command_tostring(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Converts a variable to string in place.
+        '''
+        args = i.args
+        if self.variables[i.operands[0].slot] is None:
+            raise EngineException(f'Unknown variable {args[0]}', self.filename, i.line)
+        var = self.variables[i.operands[0].slot]
+        var.value = string_value(var)
+        var.type = STRING
+
+
+    # logic
+
+    def command_ifequals(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Runs the next line if the variable equals to another.
+        '''
+        var1 = self.get_operand(i.operands[0]).value
+        var2 = self.get_operand(i.operands[1]).value
+        
+        if not(var1 == var2):
+            return i.jump
+
+
+    def command_ifdiff(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Runs the next line if the variable doesn't equal to another.
+        '''
+        var1 = self.get_operand(i.operands[0]).value
+        var2 = self.get_operand(i.operands[1]).value
+        
+        if not(var1 != var2):
+            return i.jump
+
+
+    def command_ifgreater(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Runs the next line if the variable is greater than another.
+        '''
+        var1 = self.get_operand(i.operands[0], [INTEGER,FLOAT]).value
+        var2 = self.get_operand(i.operands[1], [INTEGER,FLOAT]).value
+        
+        if not(var1 > var2):
+            return i.jump
+
+
+    def command_ifsmaller(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Runs the next line if the variable is smaller than another.
+        '''
+        var1 = self.get_operand(i.operands[0], [INTEGER,FLOAT]).value
+        var2 = self.get_operand(i.operands[1], [INTEGER,FLOAT]).value
+        
+        if not(var1 < var2):
+            return i.jump
+
+
+    # window management
+
+    def command_setres(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Sets window resolution.
+        '''
+        x = self.get_operand(i.operands[0], type=[INTEGER]).value
+        y = self.get_operand(i.operands[1], type=[INTEGER]).value
+        if x <= 0 or y <= 0:
+            raise EngineException(f'Window size must be greater than 0', self.filename, i.line)
+        # queued sprites belong to the old surface
+        self.flush()
+        self.edit_window_size(x, y)
+        self.redraw = True
+
+
+    def command_setfps(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Sets window fps.
+        '''
+        fps = self.get_operand(i.operands[0], type=[INTEGER]).value
+        if fps < 0:
+            raise EngineException(f'Target FPS must be greater than or equal to zero', self.filename, i.line)
+        self.fps = fps
+
+
+    def command_loadsheet(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Loads spritesheet from a file.
+        '''
+        filename = self.get_operand(i.operands[0], type=[STRING]).value
+        self.load_spritesheet(filename)
+
+
+    def command_fill(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Fills window with color and covers everything.
+        '''
+        r = self.get_operand(i.operands[0], type=[INTEGER]).value
+        g = self.get_operand(i.operands[1], type=[INTEGER]).value
+        b = self.get_operand(i.operands[2], type=[INTEGER]).value
+        if (r < 0 or r > 255) or (g < 0 or g > 255) or (b < 0 or b > 255):
+            raise EngineException(f'Color value must be from 0 to 255', self.filename, i.line)
+        # filling covers every queued sprite, so they don't have to be drawn
+        self.draw_list.clear()
+        self.draw_layers.clear()
+        self.layered = False
+        self.surface.fill((r,g,b))
+
+        # filling with the same color only changes the sprites drawn since the last fill
+        if self.track_dirty:
+            if (r,g,b) == self.fill_color and len(self.drawn) <= MAX_DIRTY_RECTS:
+                self.dirty.extend(self.drawn)
+            else:
+                self.redraw = True
+            self.drawn = []
+            self.fill_color = (r,g,b)
+
+
+    def command_drawsprite(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Queues a sprite to be drawn on top of everything at the end of the frame.
+        '''
+        sprite = self.get_operand(i.operands[0], type=[STRING]).value
+        x = self.get_operand(i.operands[1], type=[INTEGER,FLOAT]).value
+        y = self.get_operand(i.operands[2], type=[INTEGER,FLOAT]).value
+        if sprite not in self.sprites:
+            raise EngineException(f'Sprite {sprite} not found', self.filename, i.line)
+        layer = 0
+        if len(i.operands) > 3:
+            layer = self.get_operand(i.operands[3], type=[INTEGER,FLOAT]).value
+            self.layered = True
+        self.draw_list.append((self.sprites[sprite], (x, y)))
+        self.draw_layers.append(layer)
+
+
+    def command_drawsprites(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Queues a sprite for every pair of elements of two arrays of positions.
+        The sprite is a name or an array with a sprite name for every position.
+        '''
+        xs = self.get_array(i.args[1], i.line)
+        ys = self.get_array(i.args[2], i.line)
+        if len(xs) != len(ys):
+            raise EngineException('DRAWSPRITES requires arrays of the same length', self.filename, i.line)
+        try:
+            x_values = xs.numbers('DRAWSPRITES')
+            y_values = ys.numbers('DRAWSPRITES')
+        except ValueError as e:
+            raise EngineException(str(e), self.filename, i.line)
+        if isinstance(xs, TypedArray):
+            x_values = x_values.tolist()
+        if isinstance(ys, TypedArray):
+            y_values = y_values.tolist()
+
+        operand = i.operands[0]
+        if isinstance(operand, Reference) and operand.text in self.arrays:
+            names = self.arrays[operand.text]
+            if len(names) != len(xs):
+                raise EngineException('DRAWSPRITES requires arrays of the same length', self.filename, i.line)
+            if isinstance(names, TypedArray) or True in [var.type != STRING for var in names]:
+                raise EngineException('DRAWSPRITES requires an array of sprite names', self.filename, i.line)
+            for var in names:
+                if var.value not in self.sprites:
+                    raise EngineException(f'Sprite {var.value} not found', self.filename, i.line)
+            surfaces = [self.sprites[var.value] for var in names]
+        else:
+            sprite = self.get_operand(operand, type=[STRING]).value
+            if sprite not in self.sprites:
+                raise EngineException(f'Sprite {sprite} not found', self.filename, i.line)
+            surfaces = [self.sprites[sprite]]*len(xs)
+
+        layer = 0
+        if len(i.operands) > 3:
+            layer = self.get_operand(i.operands[3], type=[INTEGER,FLOAT]).value
+            self.layered = True
+        self.draw_list.extend(zip(surfaces, zip(x_values, y_values)))
+        self.draw_layers.extend([layer]*len(xs))
+
+
+    def command_drawtransform(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Queues a scaled, rotated and flipped sprite to be drawn at the end of the frame.
+        '''
+        sprite = self.get_operand(i.operands[0], type=[STRING]).value
+        x = self.get_operand(i.operands[1], type=[INTEGER,FLOAT]).value
+        y = self.get_operand(i.operands[2], type=[INTEGER,FLOAT]).value
+        scale = self.get_operand(i.operands[3], type=[INTEGER,FLOAT]).value
+        angle = self.get_operand(i.operands[4], type=[INTEGER,FLOAT]).value
+        flip_x = self.get_operand(i.operands[5], type=[BOOL]).value if len(i.operands) > 5 else False
+        flip_y = self.get_operand(i.operands[6], type=[BOOL]).value if len(i.operands) > 6 else False
+        if sprite not in self.sprites:
+            raise EngineException(f'Sprite {sprite} not found', self.filename, i.line)
+        if not math.isfinite(scale) or not math.isfinite(angle):
+            raise EngineException('Scale and angle must be finite', self.filename, i.line)
+        if scale <= 0:
+            raise EngineException('Scale must be greater than 0', self.filename, i.line)
+        if max(transformed_size(self.sprites[sprite], scale, angle)) > MAX_TRANSFORM_SIZE:
+            raise EngineException(
+                f'Transformed sprite must not be larger than {MAX_TRANSFORM_SIZE} pixels', self.filename, i.line
+            )
+        layer = 0
+        if len(i.operands) > 7:
+            layer = self.get_operand(i.operands[7], type=[INTEGER,FLOAT]).value
+            self.layered = True
+
+        # transforming a sprite every frame is slow, so transformed sprites are cached
+        scale, angle = quantize_transform(scale, angle)
+        key = (sprite, scale, angle, flip_x, flip_y)
+        transformed = self.transforms.get(key)
+        if transformed is None:
+            transformed = transform_surface(self.sprites[sprite], scale, angle, flip_x, flip_y)
+            self.transforms.put(key, transformed)
+        surface, (dx, dy) = transformed
+        self.draw_list.append((surface, (x+dx, y+dy)))
+        self.draw_layers.append(layer)
+
+
+    def command_getfps(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the average frame rate into a variable.
+        '''
+        self.assign(i.operands[0].slot, FLOAT, self.timer.fps())
+
+
+    def command_getframetime(self, i:Instruction, frame:Frame) -> Optional[int]:
+        '''
+        Puts the time the last frame took in milliseconds into a variable.
+        '''
+        self.assign(i.operands[0].slot, FLOAT, self.timer.frame_time()*1000)
+
+
+    def flush(self):
+        '''
+        Draws all queued sprites with one call, lower layers first.
+        Sprites on the same layer are drawn in the order they were queued.
+        '''
+        if self.layered:
+            order = sorted(range(len(self.draw_list)), key=self.draw_layers.__getitem__)
+            self.draw_list[:] = [self.draw_list[index] for index in order]
+        if self.draw_list:
+            self.surface.fblits(self.draw_list)
+        self.timer.sprites = len(self.draw_list)
+
+        if self.track_dirty:
+            # positions can be floats, so the regions have a pixel of margin
+            rects = [
+                pg.Rect(x-1, y-1, sprite.get_width()+2, sprite.get_height()+2)
+                    for sprite, (x, y) in self.draw_list
+            ]
+            self.dirty.extend(rects)
+            self.drawn.extend(rects)
+            if len(self.dirty) > MAX_DIRTY_RECTS:
+                self.redraw = True
+
+        self.draw_list.clear()
+        self.draw_layers.clear()
+        self.layered = False
+
+
+    def step(self):
+        '''
+        Runs game cycle and draws the queued sprites.
+        '''
+        self.execute(self.loop)
+        self.flush()
+
+
+class App:
+    def __init__(self, ipyp: IPYP, headless:bool=False, dirty:bool=False):
+        '''
+        Window that runs a project.
+
+        If `headless` is True, frames are drawn to an offscreen surface
+        instead of a window, so projects can run without a display.
+
+        If `dirty` is True, only the regions of the game surface that
+        changed are scaled and updated on the window when the surface is
+        scaled by a whole number. Otherwise the whole window is redrawn
+        every frame.
+        '''
+        self.windowsize: Tuple[int,int] = (640,480)
+        self.scalesize: Tuple[int,int] = [640,480]
+        self.ipyp: IPYP = ipyp
+        self.ipyp.size_update_callback = self.update_size
+        self.headless: bool = headless # whether to draw to an offscreen surface
+        self.overlay: bool = False # whether to draw the stats overlay
+        self.font: pg.font.Font = None # font of the stats overlay, loaded when first needed
+        self.dirty: bool = dirty # whether to redraw only changed regions
+        self.updated: Optional[List[pg.Rect]] = None # regions of the window to update, None for the whole window
+        self.ipyp.track_dirty = dirty
+        self.windowrect: pg.Rect = None # region of the window the game surface is scaled to
+        self.target: pg.Surface = None # subsurface of the window at `windowrect`
+        self.factor: int = 0 # scale of the game surface if it is a whole number, 0 otherwise
+        self.clear: bool = True # whether the bars around the game surface have to be cleared
+
+        self.running: bool = True
+        self.window = self.open_window()
+        self.clock = pg.Clock()
+        self.ipyp.surface = None
+        if not headless:
+            self.ipyp.convert_sprites()
+
+    def open_window(self, flags:int=0) -> pg.Surface:
+        '''
+        Creates the window surface, or an offscreen surface in headless mode.
+        '''
+        if self.headless:
+            return pg.Surface(self.windowsize)
+        return pg.display.set_mode(self.windowsize, flags)
+
+    def update_size(self):
+        '''
+        Updates the values of how the window is supposed to be
+        resized.
+        '''
+        # calculating the size of the screen
+        if self.windowsize[0]/self.ipyp.ratio[0] > self.windowsize[1]/self.ipyp.ratio[1]:
+            self.scalesize[0] = self.windowsize[1]/self.ipyp.ratio[1]*self.ipyp.ratio[0]
+            self.scalesize[1] = self.windowsize[1]
+
+        elif self.windowsize[1]/self.ipyp.ratio[1] > self.windowsize[0]/self.ipyp.ratio[0]:
+            self.scalesize[0] = self.windowsize[0]
+            self.scalesize[1] = self.windowsize[0]/self.ipyp.ratio[0]*self.ipyp.ratio[1]
+            
+        else:
+            self.scalesize[0] = self.windowsize[0]
+            self.scalesize[1] = self.windowsize[1]
+
+        # updating rect of the screen
+        self.windowrect = pg.Rect(0, 0, round(self.scalesize[0]), round(self.scalesize[1]))
+        self.windowrect.center = (self.windowsize[0]/2, self.windowsize[1]/2)
+        self.window = self.open_window(pg.RESIZABLE)
+        self.windowrect = self.windowrect.clip(self.window.get_rect())
+
+        # the game surface is scaled straight into the window, so no scaled surface is allocated per frame
+        self.target = self.window.subsurface(self.windowrect)
+        factor: float = self.windowrect.w/self.ipyp.size[0]
+        if factor == int(factor) and self.windowrect.h == self.ipyp.size[1]*factor:
+            self.factor = int(factor)
+        else:
+            self.factor = 0
+        self.clear = True
+
+        # updating game surface
+        self.ipyp.surface = pg.Surface(self.ipyp.size)
+        self.ipyp.redraw = True
+
+    def scale(self):
+        '''
+        Scales the game surface to the window.
+        '''
+        surface: pg.Surface = self.ipyp.surface
+        self.updated = None
+        if surface is None:
+            self.window.fill((0,0,0))
+            return
+
+        # scaling parts of the surface by a fraction would round differently than scaling all of it
+        if self.dirty and self.factor and not self.ipyp.redraw and not self.overlay:
+            self.updated = self.scale_dirty(self.factor)
+            return
+
+        # the bars only change after resizing or while the overlay covers them
+        if self.clear or self.overlay:
+            self.window.fill((0,0,0))
+            self.clear = self.overlay
+        if self.factor == 1:
+            self.target.blit(surface, (0,0))
+        else:
+            pg.transform.scale(surface, self.target.get_size(), self.target)
+        self.ipyp.redraw = False
+        self.ipyp.dirty.clear()
+
+    def scale_dirty(self, factor:int) -> List[pg.Rect]:
+        '''
+        Scales the changed regions of the game surface to the window
+        and returns the regions of the window they cover.
+        '''
+        surface: pg.Surface = self.ipyp.surface
+        bounds: pg.Rect = surface.get_rect()
+        updated: List[pg.Rect] = []
+        for rect in self.ipyp.dirty:
+            rect = rect.clip(bounds)
+            if rect.w == 0 or rect.h == 0:
+                continue
+            target = pg.Rect(
+                self.windowrect.x+rect.x*factor, self.windowrect.y+rect.y*factor,
+                rect.w*factor, rect.h*factor
+            )
+            pg.transform.scale(surface.subsurface(rect), target.size, self.window.subsurface(target))
+            updated.append(target)
+        self.ipyp.dirty.clear()
+        return updated
+
+    def present(self):
+        '''
+        Draws the stats overlay if it is enabled and shows the window.
+        '''
+        if self.overlay:
+            self.draw_overlay()
+        if self.headless:
+            return
+        if self.updated is None:
+            pg.display.update()
+        elif self.updated:
+            pg.display.update(self.updated)
+
+    def render(self):
+        '''
+        Scales the game surface to the window and shows it.
+        '''
+        self.scale()
+        self.present()
+
+    def draw_overlay(self):
+        '''
+        Draws a graph of recent frame times split into phases
+        and the average frame rate on top of the window.
+        '''
+        timer: FrameTimer = self.ipyp.timer
+        width: int = OVERLAY_BAR*timer.frames.maxlen
+        graph = pg.Surface((width, OVERLAY_HEIGHT+OVERLAY_LINE*(len(PHASES)+3)+4), pg.SRCALPHA)
+        graph.fill((0,0,0,160))
+
+        # one bar per frame with a segment per phase
+        for index, times in enumerate(timer.frames):
+            bottom: float = OVERLAY_HEIGHT
+            for phase, elapsed in enumerate(times):
+                height: float = elapsed*1000*OVERLAY_SCALE
+                rect = pg.Rect(index*OVERLAY_BAR, round(bottom-height), OVERLAY_BAR, max(round(height), 0))
+                graph.fill(OVERLAY_COLORS[phase], rect)
+                bottom -= height
+
+        # target frame time
+        target: float = 1000/(self.ipyp.fps or 60)*OVERLAY_SCALE
+        pg.draw.line(graph, (255,255,255), (0, OVERLAY_HEIGHT-target), (width, OVERLAY_HEIGHT-target))
+
+        if self.font is None:
+            pg.font.init()
+            self.font = pg.font.Font(None, 16)
+        stats = timer.stats()
+        lines: List[str] = [f'{stats["fps"]:.1f} FPS, {stats["frame_ms"]:.2f} ms']+[
+            f'{name} {stats[f"{name}_ms"]:.2f} ms' for name in PHASES
+        ]+[
+            f'{stats["sprites"]} sprites',
+            f'{len(self.ipyp.transforms)} transformed, {self.ipyp.transforms.hit_rate()*100:.0f}% hits, '\
+                f'{self.ipyp.transforms.size/1024/1024:.1f} MB'
+        ]
+        for index, line in enumerate(lines):
+            color = OVERLAY_COLORS[index-1] if 0 < index <= len(PHASES) else (255,255,255)
+            graph.blit(self.font.render(line, True, color), (4, OVERLAY_HEIGHT+2+index*OVERLAY_LINE))
+
+        self.window.blit(graph, (0,0))
+
+    def run(self):
+        '''
+        Runs the game loop.
+
+        The time of every phase of a frame is measured in `IPYP.timer`.
+        F3 toggles the stats overlay.
+        '''
+        self.ipyp.execute(self.ipyp.pre)
+
+        timer: FrameTimer = self.ipyp.timer
+        timer.start()
+        while self.running:
+            for event in pg.event.get():
+                if event.type == pg.QUIT:
+                    self.running = False
+                if event.type == pg.VIDEORESIZE:
+                    self.windowsize = (event.w, event.h)
+                    self.update_size()
+                if event.type == pg.KEYDOWN and pg.key.name(event.key) == OVERLAY_KEY:
+                    self.overlay = not self.overlay
+                    self.ipyp.redraw = True
+            timer.mark(PHASE_EVENTS)
+
+            self.ipyp.step()
+            timer.mark(PHASE_SCRIPT)
+            self.scale()
+            timer.mark(PHASE_SCALE)
+            self.present()
+            timer.mark(PHASE_PRESENT)
             self.clock.tick(self.ipyp.fps)
+            timer.mark(PHASE_SLEEP)
+            timer.finish()
@@ -1,5 +1,6 @@
 import numpy as np
 from typing import *
+from collections import OrderedDict
 
 def isnumber(value: str) -> bool:
     '''
@@ -53,4 +54,85 @@ def split_args(args:str) -> List[str]:
 
     out.append(current_arg)
 
-    return out
\ No newline at end of file
+    return out
+
+TRANSFORM_CACHE_SIZE = 32*1024*1024 # default memory budget of transformed sprites in bytes
+
+def surface_size(entry:Tuple[Any, Any]) -> int:
+    '''
+    Returns the memory a cached transformed sprite and its offset take in bytes.
+    '''
+    surface = entry[0]
+    return surface.get_width()*surface.get_height()*surface.get_bytesize()
+
+class LRUCache:
+    def __init__(self, maxsize:int, weight:Callable[[Any], int]=None):
+        '''
+        Dictionary with a size limit that evicts the least recently used keys.
+
+        By default every value counts as 1 towards `maxsize`. If `weight`
+        is given, it returns how much a value counts instead, for example
+        its size in bytes.
+        '''
+        self.maxsize: int = maxsize # maximum total weight of stored values
+        self.weight: Callable[[Any], int] = weight # function returning the weight of a value, None if every value weighs 1
+        self.data: OrderedDict = OrderedDict() # stored values from oldest to newest
+        self.weights: Dict[Hashable, int] = {} # weight of every stored value
+        self.size: int = 0 # total weight of stored values
+        self.hits: int = 0 # amount of lookups that found a value
+        self.misses: int = 0 # amount of lookups that didn't find a value
+        self.evictions: int = 0 # amount of values removed to stay within the limit
+
+    def get(self, key:Hashable, default:Any=None) -> Any:
+        '''
+        Returns the value stored under a key and marks it as recently used.
+        '''
+        if key not in self.data:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def put(self, key:Hashable, value:Any):
+        '''
+        Stores a value and evicts the oldest keys if the cache is full.
+        A value that weighs more than the whole limit is not stored.
+        '''
+        weight: int = 1 if self.weight is None else self.weight(value)
+        if key in self.data:
+            self.size -= self.weights.pop(key)
+            del self.data[key]
+        if weight > self.maxsize:
+            return
+
+        self.data[key] = value
+        self.weights[key] = weight
+        self.size += weight
+        while self.size > self.maxsize:
+            oldest, _ = self.data.popitem(last=False)
+            self.size -= self.weights.pop(oldest)
+            self.evictions += 1
+
+    def hit_rate(self) -> float:
+        '''
+        Returns the fraction of lookups that found a value, 0 if there were none.
+        '''
+        lookups: int = self.hits+self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits/lookups
+
+    def clear(self):
+        '''
+        Removes all values and resets the counters.
+        '''
+        self.data.clear()
+        self.weights.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.data)
@@ -0,0 +1,258 @@
+from typing import *
+
+from .constants import *
+from .objects import *
+
+
+JIT_THRESHOLD = 10 # amount of runs after which a block is compiled
+MAX_BLOCK_SIZE = 5000 # blocks with more instructions are always interpreted
+
+ARITHMETIC = {OP_ADD: '+=', OP_SUB: '-=', OP_MUL: '*=', OP_DIV: '/='}
+CONDITIONS = {OP_IFEQUALS: '==', OP_IFDIFF: '!=', OP_IFGREATER: '>', OP_IFSMALLER: '<'}
+NUMBERS = (INTEGER, FLOAT)
+
+
+class Translation:
+    def __init__(self, code:List[Instruction]):
+        '''
+        Python source of a block of instructions that is being generated.
+
+        Objects the source refers to, such as instructions, handlers and
+        literal values, are passed to the generated code as closure variables.
+        '''
+        self.code: List[Instruction] = code # original instructions
+        self.lines: List[str] = [] # lines of the generated function body
+        self.objects: Dict[str, Any] = {} # objects used by the source with keys as their names
+
+    def emit(self, indent:int, line:str):
+        '''
+        Adds a line of source code.
+        '''
+        self.lines.append('    '*indent+line)
+
+    def name(self, prefix:str, index:int, value:Any) -> str:
+        '''
+        Makes an object available to the source and returns its name.
+        '''
+        name: str = f'{prefix}{index}'
+        self.objects[name] = value
+        return name
+
+
+class TraceCompiler:
+    def __init__(self, engine, threshold:int=JIT_THRESHOLD):
+        '''
+        Translates blocks of instructions that run often into Python functions.
+
+        Blocks are interpreted by `IPYP.run_code` until they have run
+        `threshold` times. Then they are translated into Python source where
+        goto points become labels of a `while` loop and common commands on
+        variables and literals run inline. Other commands and cases the
+        inline code doesn't cover, such as type errors, call the command
+        handlers, so results and errors are the same as in the interpreter.
+        Blocks that can't be translated keep being interpreted.
+        '''
+        self.engine = engine # IPYP object the code belongs to
+        self.threshold: int = threshold # amount of runs after which a block is compiled
+        self.counts: Dict[int, int] = {} # amount of runs of each block with keys as ids of the blocks
+        self.compiled: Dict[int, Optional[Callable]] = {} # compiled blocks, None if a block can't be translated
+
+
+    def run(self, code:List[Instruction], frame:Frame=None) -> Variable:
+        '''
+        Runs a block of instructions, compiling it once it is hot.
+        '''
+        key: int = id(code)
+        function: Optional[Callable] = self.compiled.get(key)
+        if function is not None:
+            return function(frame if frame is not None else Frame())
+
+        if key not in self.compiled:
+            self.counts[key] = self.counts.get(key, 0)+1
+            if self.counts[key] >= self.threshold:
+                self.compiled[key] = self.compile(code)
+
+        return self.engine.run_code(code, frame)
+
+
+    def compile(self, code:List[Instruction]) -> Optional[Callable]:
+        '''
+        Compiles a block of instructions into a Python function that takes
+        a `Frame`. Returns None if the block can't be translated.
+        '''
+        if len(code) == 0 or len(code) > MAX_BLOCK_SIZE or self.engine.profiler is not None:
+            return None
+
+        translation: Translation = self.translate(code)
+        names: List[str] = list(translation.objects)
+        source: str = f'def factory({", ".join(names)}):\n'\
+            '    def block(frame):\n'\
+            + '\n'.join(['        '+line for line in translation.lines])\
+            + '\n    return block\n'
+
+        namespace: Dict[str, Any] = {}
+        try:
+            exec(compile(source, f'<block {id(code)}>', 'exec'), namespace)
+        except (SyntaxError, RecursionError, MemoryError, ValueError):
+            return None
+        return namespace['factory'](*[translation.objects[name] for name in names])
+
+
+    def labels(self, code:List[Instruction]) -> List[int]:
+        '''
+        Returns indexes of the instructions that start a label:
+        the first instruction and all jump targets.
+        '''
+        labels: Set[int] = {0}
+        for i in code:
+            if i.jump is not None and i.jump < len(code):
+                labels.add(i.jump)
+        return sorted(labels)
+
+
+    def translate(self, code:List[Instruction]) -> Translation:
+        '''
+        Generates the source of the function body of a block.
+        '''
+        t = Translation(code)
+        t.objects.update({
+            'engine': self.engine, 'Variable': Variable, 'RETURN_NULL': RETURN_NULL,
+            'NUMBERS': NUMBERS, 'FLOAT': FLOAT, 'STOP': STOP
+        })
+        t.emit(0, 'variables = engine.variables')
+        t.emit(0, 'names = engine.scope.names')
+        t.emit(0, 'arguments = frame.locals')
+        t.emit(0, 'label = 0')
+        t.emit(0, 'while True:')
+
+        labels: List[int] = self.labels(code)
+        for number, start in enumerate(labels):
+            end: int = labels[number+1] if number+1 < len(labels) else len(code)
+            t.emit(1, f'{"if" if number == 0 else "elif"} label == {start}:')
+            t.emit(2, 'pass')
+            for i in code[start:end]:
+                self.translate_instruction(t, i, 2)
+            # running into the next label or finishing the block
+            if end < len(code):
+                t.emit(2, f'label = {end}')
+                t.emit(2, 'continue')
+            else:
+                t.emit(2, 'return RETURN_NULL')
+        # jumps past the end of the block
+        t.emit(1, 'return RETURN_NULL')
+
+        return t
+
+
+    def value(self, t:Translation, operand:Operand) -> Tuple[str, bool]:
+        '''
+        Returns an expression that reads an operand and whether it can be None.
+        '''
+        if isinstance(operand, Constant):
+            return t.name('c', len(t.objects), operand.variable), False
+        if isinstance(operand, Local):
+            return f'arguments[{operand.index}]', False
+        return f'variables[{operand.slot}]', True
+
+
+    def jump(self, t:Translation, target:int, indent:int):
+        '''
+        Emits a jump to an instruction index.
+        '''
+        if target >= len(t.code):
+            t.emit(indent, 'return RETURN_NULL')
+        else:
+            t.emit(indent, f'label = {target}')
+            t.emit(indent, 'continue')
+
+
+    def translate_instruction(self, t:Translation, i:Instruction, indent:int):
+        '''
+        Emits the source of one instruction.
+        '''
+        simple: bool = True not in [not isinstance(op, (Constant, Reference, Local)) for op in i.operands]
+        instruction: str = t.name('i', i.index, i)
+        handler: str = t.name('h', i.index, self.engine.handlers[i.opcode])
+        call: str = f'{handler}({instruction}, frame)'
+
+        # commands that do nothing
+        if i.opcode in [OP_NOOP, OP_POINT]:
+            return
+
+        # jumps
+        if i.opcode == OP_GOTO:
+            self.jump(t, i.jump, indent)
+
+        elif i.opcode == OP_BREAK:
+            t.emit(indent, 'return RETURN_NULL')
+
+        elif i.opcode == OP_RETURN and simple:
+            value, nullable = self.value(t, i.operands[0])
+            if nullable:
+                t.emit(indent, f'if {value} is not None:')
+                t.emit(indent+1, f'return {value}')
+                t.emit(indent, f'{call}')
+            else:
+                t.emit(indent, f'return {value}')
+
+        elif i.opcode in CONDITIONS and simple:
+            var1, nullable1 = self.value(t, i.operands[0])
+            var2, nullable2 = self.value(t, i.operands[1])
+            t.emit(indent, f'var1 = {var1}')
+            t.emit(indent, f'var2 = {var2}')
+            checks: List[str] = [f'{name} is not None' for name, nullable in
+                [('var1', nullable1), ('var2', nullable2)] if nullable]
+            if i.opcode in [OP_IFGREATER, OP_IFSMALLER]:
+                checks += ['var1.type in NUMBERS', 'var2.type in NUMBERS']
+            t.emit(indent, f'if {" and ".join(checks) or "True"}:')
+            t.emit(indent+1, f'if not (var1.value {CONDITIONS[i.opcode]} var2.value):')
+            self.jump(t, i.jump, indent+2)
+            t.emit(indent, f'elif {call} is not None:')
+            self.jump(t, i.jump, indent+1)
+
+        # variables
+        elif i.opcode == OP_ASSIGN and simple:
+            value, nullable = self.value(t, i.operands[1])
+            slot: int = i.operands[0].slot
+            t.emit(indent, f'value = {value}')
+            if nullable:
+                t.emit(indent, 'if value is None:')
+                t.emit(indent+1, f'{call}')
+                t.emit(indent, 'else:')
+                indent += 1
+            t.emit(indent, f'var = variables[{slot}]')
+            t.emit(indent, 'if var is None:')
+            t.emit(indent+1, f'variables[{slot}] = Variable(names[{slot}], value.type, value.value)')
+            t.emit(indent, 'else:')
+            t.emit(indent+1, 'var.type = value.type')
+            t.emit(indent+1, 'var.value = value.value')
+
+        elif i.opcode in ARITHMETIC and simple:
+            value, nullable = self.value(t, i.operands[1])
+            t.emit(indent, f'var = variables[{i.operands[0].slot}]')
+            t.emit(indent, f'value = {value}')
+            checks: List[str] = ['var is not None', 'var.type in NUMBERS']
+            if nullable:
+                checks.append('value is not None')
+            if not isinstance(i.operands[1], Constant) or i.operands[1].type not in NUMBERS:
+                checks.append('value.type in NUMBERS')
+            t.emit(indent, f'if {" and ".join(checks)}:')
+            t.emit(indent+1, f'var.value {ARITHMETIC[i.opcode]} value.value')
+            if i.opcode == OP_DIV:
+                t.emit(indent+1, 'var.type = FLOAT')
+            elif not isinstance(i.operands[1], Constant):
+                t.emit(indent+1, 'if value.type == FLOAT:')
+                t.emit(indent+2, 'var.type = FLOAT')
+            elif i.operands[1].type == FLOAT:
+                t.emit(indent+1, 'var.type = FLOAT')
+            t.emit(indent, 'else:')
+            t.emit(indent+1, f'{call}')
+
+        # other commands run their handlers
+        else:
+            t.emit(indent, f'jump = {call}')
+            t.emit(indent, 'if jump is not None:')
+            t.emit(indent+1, 'if jump == STOP:')
+            t.emit(indent+2, 'return frame.value')
+            t.emit(indent+1, 'label = jump')
+            t.emit(indent+1, 'continue')
@@ -0,0 +1,73 @@
+from typing import *
+
+from .constants import *
+from .objects import *
+from .arrays import *
+
+
+class Map(dict):
+    '''
+    Hash map from keys to variables.
+
+    Keys are stored as tuples of types and values, so `1`, `1.0` and
+    `TRUE` are different keys. Values are shared variables that are
+    never changed in place. Methods raise `ValueError` with a message
+    for the user if the values can't be used.
+    '''
+    def __init__(self, key_type:int=ANY, value_type:int=ANY):
+        super().__init__()
+        self.key_type: int = key_type # type of all keys
+        self.value_type: int = value_type # type of all values
+
+
+    def convert(self, variable:Variable, type:int, kind:str, action:str) -> Tuple[int, Any]:
+        '''
+        Returns the type and the value a variable is stored with.
+        Integers can be used where floats are required.
+        '''
+        if type == ANY or variable.type == type:
+            return variable.type, variable.value
+        if type == FLOAT and variable.type == INTEGER:
+            try:
+                return FLOAT, float(variable.value)
+            except OverflowError:
+                raise ValueError(f'{action} requires a {kind} that fits in a FLOAT')
+        raise ValueError(f'{action} requires a {kind} of type {LIST_TYPES[type]} for this map')
+
+
+    def key(self, variable:Variable, action:str) -> Tuple[int, Any]:
+        '''
+        Returns the key a variable is stored under.
+        '''
+        if variable.type == NULL:
+            raise ValueError(f'{action} requires a key that is not NULL')
+        return self.convert(variable, self.key_type, 'key', action)
+
+
+    def set(self, key:Variable, value:Variable):
+        '''
+        Stores a value under a key. Keys of INTEGER maps have to fit
+        in 64 bits, so MAPKEYS can put them into an INTEGER array.
+        '''
+        if self.key_type == INTEGER and key.type == INTEGER and not fits_int64(key.value):
+            raise ValueError('MAPSET requires a key that fits in 64 bits for INTEGER maps')
+        self[self.key(key, 'MAPSET')] = shared_variable(*self.convert(value, self.value_type, 'value', 'MAPSET'))
+
+
+    def lookup(self, key:Variable, action:str) -> Optional[Variable]:
+        '''
+        Returns the value stored under a key or None if there is no such key.
+        '''
+        return self.get(self.key(key, action))
+
+
+    def keys_array(self) -> Union[Array, TypedArray]:
+        '''
+        Returns an array of all keys in the order they were added.
+        '''
+        if self.key_type in ARRAY_TYPES:
+            array = TypedArray(self.key_type, len(self))
+            for type, value in self:
+                array.append(shared_variable(type, value))
+            return array
+        return Array([shared_variable(type, value) for type, value in self])
@@ -0,0 +1,278 @@
+from typing import *
+from collections.abc import MutableMapping
+
+from .errors import *
+from .functions import *
+from .constants import *
+
+
+class Variable:
+    __slots__ = ('name', 'type', 'value')
+
+    def __init__(self, name:str, type:int, value:Any):
+        self.name: str = name
+        self.type: int = type
+        self.value: Any = value
+
+
+# shared variables for common values
+# they are only read and copied, never stored in a slot or changed
+NULL_VARIABLE: Variable = Variable('NULL', NULL, None)
+TRUE_VARIABLE: Variable = Variable('TRUE', BOOL, True)
+FALSE_VARIABLE: Variable = Variable('FALSE', BOOL, False)
+RETURN_NULL: Variable = Variable('*RETURN_VALUE', NULL, None) # result of blocks that return nothing
+SMALL_INTEGERS: range = range(-128, 1024) # integers that have shared variables
+INTEGER_VARIABLES: List[Variable] = [Variable(str(i), INTEGER, i) for i in SMALL_INTEGERS]
+CHARACTER_VARIABLES: Dict[str, Variable] = {} # one-character strings, filled when used
+
+
+def shared_variable(type:int, value:Any) -> Variable:
+    '''
+    Returns a shared variable for common values or a new variable
+    otherwise. The result must not be changed.
+    '''
+    if type == NULL:
+        return NULL_VARIABLE
+    if type == BOOL:
+        return TRUE_VARIABLE if value else FALSE_VARIABLE
+    if type == INTEGER and SMALL_INTEGERS.start <= value < SMALL_INTEGERS.stop:
+        return INTEGER_VARIABLES[value-SMALL_INTEGERS.start]
+    if type == STRING and len(value) == 1:
+        if value not in CHARACTER_VARIABLES:
+            CHARACTER_VARIABLES[value] = Variable(value, STRING, value)
+        return CHARACTER_VARIABLES[value]
+    return Variable(str(value), type, value)
+
+
+def string_value(variable:Variable) -> str:
+    '''
+    Returns the text representation of a variable.
+    '''
+    if variable.type == BOOL:
+        return 'TRUE' if variable.value else 'FALSE'
+    if variable.type in [INTEGER, FLOAT, STRING]:
+        return str(variable.value)
+    return 'NULL'
+
+
+class Operand:
+    '''
+    Command argument that was parsed at compile time.
+    '''
+    __slots__ = ('text', 'slot')
+
+    def __init__(self, text:str):
+        self.text: str = text # original argument string
+        self.slot: int = None # index of the variable named by the argument
+
+    def get(self, engine) -> Variable:
+        '''
+        Evaluates the operand and returns a `Variable` object.
+        '''
+        raise NotImplementedError
+
+
+class Constant(Operand):
+    '''
+    Literal value (null, bool, integer, float or string).
+    '''
+    __slots__ = ('type', 'value', 'variable')
+
+    def __init__(self, text:str, type:int, value:Any):
+        super().__init__(text)
+        self.type: int = type # type of the literal
+        self.value: Any = value # already converted value
+        self.variable: Variable = shared_variable(type, value) # shared result, never stored directly
+
+    def get(self, engine) -> Variable:
+        return self.variable
+
+
+class Reference(Operand):
+    '''
+    Reference to a variable by its name.
+    '''
+    __slots__ = ()
+
+    def get(self, engine) -> Variable:
+        variable: Variable = engine.variables[self.slot]
+        if variable is None:
+            raise EngineException(
+                f'Unknown keyword {self.text} or such variable does not exist',
+                engine.filename
+            )
+        return variable
+
+
+class Local(Operand):
+    '''
+    Reference to an argument of the function that is being run.
+    '''
+    __slots__ = ('index',)
+
+    def __init__(self, text:str, index:int):
+        super().__init__(text)
+        self.index: int = index # index of the argument in the frame
+
+    def get(self, engine) -> Variable:
+        return engine.frames[-1].locals[self.index]
+
+
+class Call(Operand):
+    '''
+    Function call wrapped in dollar signs with pre-parsed arguments.
+    '''
+    __slots__ = ('function', 'args')
+
+    def __init__(self, text:str, function:str, args:List[Operand]):
+        super().__init__(text)
+        self.function: str = function # name of the function to call
+        self.args: List[Operand] = args # arguments passed to the function
+
+    def get(self, engine) -> Variable:
+        return engine.call(self.function, [arg.get(engine) for arg in self.args])
+
+
+class MapItem(Operand):
+    '''
+    Value stored in a map under a key, written as `NAME[KEY]`.
+    '''
+    __slots__ = ('map', 'key')
+
+    def __init__(self, text:str, map:str, key:Operand):
+        super().__init__(text)
+        self.map: str = map # name of the map
+        self.key: Operand = key # key to look up
+
+    def get(self, engine) -> Variable:
+        return engine.get_map_item(self.map, self.key.get(engine))
+
+
+def parse_operand(value:str) -> Operand:
+    '''
+    Converts a command argument to an `Operand` object.
+    '''
+    # null type
+    if value == 'NULL':
+        return Constant(value, NULL, None)
+
+    # bool
+    elif value.upper() in ['TRUE','FALSE']:
+        return Constant(value, BOOL, value.upper()=='TRUE')
+
+    # integer
+    elif isint(value):
+        return Constant(value, INTEGER, int(value))
+
+    # float
+    elif isnumber(value):
+        return Constant(value, FLOAT, float(value))
+
+    # string
+    elif value.startswith('"') and value.endswith('"'):
+        return Constant(value, STRING, value[1:-1])
+
+    # function
+    elif value.startswith('$') and value.endswith('$'):
+        call = value[1:-1].split(' ')
+        return Call(value, call[0], [parse_operand(i) for i in call[1:]])
+
+    # map item
+    elif value.endswith(']') and value.find('[') > 0:
+        start = value.find('[')
+        return MapItem(value, value[:start], parse_operand(value[start+1:-1]))
+
+    # another variable
+    else:
+        return Reference(value)
+
+
+class Scope(MutableMapping):
+    '''
+    Dictionary-like view of variables stored in numbered slots.
+    '''
+    def __init__(self):
+        self.slots: Dict[str, int] = {} # slot indexes with keys as variable names
+        self.names: List[str] = [] # variable names by slot index
+        self.variables: List[Variable] = [] # variables by slot index, None if not assigned
+
+    def slot(self, name:str) -> int:
+        '''
+        Returns the slot index of a variable, reserving a new slot if needed.
+        '''
+        if name not in self.slots:
+            self.slots[name] = len(self.variables)
+            self.names.append(name)
+            self.variables.append(None)
+        return self.slots[name]
+
+    def __getitem__(self, name:str) -> Variable:
+        if name not in self.slots or self.variables[self.slots[name]] is None:
+            raise KeyError(name)
+        return self.variables[self.slots[name]]
+
+    def __setitem__(self, name:str, variable:Variable):
+        self.variables[self.slot(name)] = variable
+
+    def __delitem__(self, name:str):
+        if name not in self:
+            raise KeyError(name)
+        self.variables[self.slots[name]] = None
+
+    def __contains__(self, name:str) -> bool:
+        return name in self.slots and self.variables[self.slots[name]] is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return (name for name, slot in self.slots.items() if self.variables[slot] is not None)
+
+    def __len__(self) -> int:
+        return len(self.variables)-self.variables.count(None)
+
+
+class Instruction:
+    __slots__ = (
+        'orig_line', 'line', 'orig_instruction', 'orig_args', 'instruction',
+        'opcode', 'args', 'operands', 'index', 'jump'
+    )
+
+    def __init__(self, line:str, line_number:int=None):
+        parts: List[str] = line.split(' ', 1)
+        self.orig_line: str = line
+        self.line: int = line_number
+        self.orig_instruction: str = parts[0]
+        self.orig_args: str = parts[1] if len(parts) > 1 else ''
+
+        self.instruction: str = self.orig_instruction.upper()
+        self.opcode: int = OPCODES.get(self.instruction, OP_UNKNOWN)
+        self.args: List[str] = split_args(self.orig_args)
+        self.operands: List[Operand] = [parse_operand(i) for i in self.args] # pre-parsed arguments
+        self.index: int = None # position of the instruction in its block
+        self.jump: int = None # index of the instruction to jump to (GOTO and IF commands)
+
+
+class Function:
+    __slots__ = ('name', 'args', 'code', 'params', 'types', 'locals', 'pure', 'temporaries')
+
+    def __init__(self, name: str, args: Dict[str,int], code:List[Instruction]):
+        self.name: str = name # function name
+        self.args: Dict[str,int] = args # arguments as dict with keys as names and values as types
+        self.code: List[Instruction] = code # list of instructions to execute
+
+        # argument layout
+        self.params: List[str] = list(args) # argument names in order
+        self.types: List[int] = list(args.values()) # argument types in order
+        self.locals: Dict[str,int] = {f'*{name}': index for index, name in enumerate(args)} # local slot indexes
+        self.pure: bool = False # whether the result depends only on the arguments
+        self.temporaries: Set[str] = set() # global variables a pure function uses as temporary values
+
+
+class Frame:
+    '''
+    State of a running block of code.
+    '''
+    __slots__ = ('function', 'locals', 'value')
+
+    def __init__(self, function:Function=None):
+        self.function: Function = function # function that is being run
+        self.locals: List[Variable] = [] # function arguments by local slot index
+        self.value: Variable = None # value the block finished with
@@ -0,0 +1,192 @@
+from typing import *
+
+from .constants import *
+from .objects import *
+
+
+ARITHMETIC = [OP_ADD, OP_SUB, OP_MUL, OP_DIV]
+CONDITIONS = [OP_IFEQUALS, OP_IFDIFF, OP_IFGREATER, OP_IFSMALLER]
+NUMBERS = [INTEGER, FLOAT]
+
+
+def is_number(operand:Operand) -> bool:
+    '''
+    Returns True if the operand is an integer or a float literal.
+    '''
+    return isinstance(operand, Constant) and operand.type in NUMBERS
+
+
+def make_constant(type:int, value:Any) -> Constant:
+    '''
+    Creates a literal operand from a computed value.
+    '''
+    return Constant(str(value), type, value)
+
+
+def jump_targets(code:List[Instruction]) -> Set[int]:
+    '''
+    Returns indexes of all instructions that can be jumped to.
+    '''
+    return {i.jump for i in code if i.jump is not None}
+
+
+def compact(code:List[Instruction], keep:List[bool]) -> int:
+    '''
+    Removes instructions from a block in place and updates their indexes
+    and jumps. Jumps to a removed instruction go to the next kept one.
+
+    Returns the amount of removed instructions.
+    '''
+    positions: List[int] = [] # new index for each old index
+    count: int = 0
+    for kept in keep:
+        positions.append(count)
+        count += kept
+    positions.append(count)
+
+    new: List[Instruction] = [i for i, kept in zip(code, keep) if kept]
+    for index, i in enumerate(new):
+        i.index = index
+        if i.jump is not None:
+            i.jump = positions[min(i.jump, len(code))]
+
+    removed: int = len(code)-len(new)
+    code[:] = new
+    return removed
+
+
+def fold_arithmetic(opcode:int, var:Constant, value:Constant) -> Optional[Constant]:
+    '''
+    Computes an arithmetic command on two literals the same way the
+    command handlers do. Returns None if it can't be computed.
+    '''
+    if opcode == OP_DIV:
+        if value.value == 0:
+            return None
+        return make_constant(FLOAT, var.value/value.value)
+
+    type = FLOAT if var.type == FLOAT or value.type == FLOAT else INTEGER
+    if opcode == OP_ADD:
+        return make_constant(type, var.value+value.value)
+    if opcode == OP_SUB:
+        return make_constant(type, var.value-value.value)
+    return make_constant(type, var.value*value.value)
+
+
+def fold_condition(i:Instruction) -> bool:
+    '''
+    Computes a condition on two literals the same way the command handlers do.
+    '''
+    var1 = i.operands[0].value
+    var2 = i.operands[1].value
+    if i.opcode == OP_IFEQUALS:
+        return var1 == var2
+    if i.opcode == OP_IFDIFF:
+        return var1 != var2
+    if i.opcode == OP_IFGREATER:
+        return var1 > var2
+    return var1 < var2
+
+
+def fold(code:List[Instruction], level:int) -> int:
+    '''
+    Folds commands on literals. Returns the amount of removed instructions.
+    '''
+    targets: Set[int] = jump_targets(code)
+    keep: List[bool] = [True]*len(code)
+
+    for index, i in enumerate(code):
+        if not keep[index]:
+            continue
+
+        # conditions on two literals either always run the next command or always skip it
+        if i.opcode in CONDITIONS and True not in [
+            not isinstance(operand, Constant) for operand in i.operands
+        ]:
+            if fold_condition(i):
+                keep[index] = False
+            else:
+                i.instruction = 'GOTO'
+                i.opcode = OP_GOTO
+            continue
+
+        # arithmetic on a variable that was just assigned a literal
+        # or several additions to the same variable in a row
+        merge: bool = i.opcode == OP_ASSIGN and is_number(i.operands[1])
+        merge = merge or (
+            level >= OPTIMIZE_FULL and i.opcode in [OP_ADD, OP_SUB]
+            and is_number(i.operands[1]) and i.operands[1].type == INTEGER
+        )
+        if not merge:
+            continue
+
+        next_index = index+1
+        while next_index < len(code) and next_index not in targets:
+            n = code[next_index]
+            if n.opcode not in ARITHMETIC or n.operands[0].text != i.operands[0].text\
+                or not is_number(n.operands[1]):
+                break
+
+            if i.opcode == OP_ASSIGN:
+                value = fold_arithmetic(n.opcode, i.operands[1], n.operands[1])
+            elif n.opcode in [OP_ADD, OP_SUB] and n.operands[1].type == INTEGER:
+                value = n.operands[1].value if n.opcode == i.opcode else -n.operands[1].value
+                value = make_constant(INTEGER, i.operands[1].value+value)
+            else:
+                value = None
+            if value is None:
+                break
+
+            i.operands[1] = value
+            keep[next_index] = False
+            next_index += 1
+
+    return compact(code, keep)
+
+
+def eliminate(code:List[Instruction]) -> int:
+    '''
+    Removes commands that do nothing and commands that can't be reached.
+    Returns the amount of removed instructions.
+    '''
+    # finding reachable commands
+    reachable: List[bool] = [False]*len(code)
+    queue: List[int] = [0]
+    while queue:
+        index = queue.pop()
+        if index >= len(code) or reachable[index]:
+            continue
+        reachable[index] = True
+        i = code[index]
+
+        if i.opcode == OP_GOTO:
+            queue.append(i.jump)
+        elif i.opcode in [OP_BREAK, OP_RETURN]:
+            continue
+        else:
+            queue.append(index+1)
+            if i.jump is not None:
+                queue.append(i.jump)
+
+    keep: List[bool] = []
+    for index, i in enumerate(code):
+        useless: bool = i.opcode in [OP_NOOP, OP_POINT] or (i.opcode == OP_GOTO and i.jump == index+1)
+        keep.append(reachable[index] and not useless)
+
+    return compact(code, keep)
+
+
+def optimize(code:List[Instruction], level:int=OPTIMIZE_SAFE) -> int:
+    '''
+    Optimizes a block of code with resolved jumps in place.
+    Returns the amount of removed instructions.
+    '''
+    if level <= OPTIMIZE_NONE:
+        return 0
+
+    removed: int = 0
+    while True:
+        count: int = fold(code, level)+eliminate(code)
+        if count == 0:
+            return removed
+        removed += count
@@ -0,0 +1,172 @@
+from typing import *
+import time
+
+from .objects import *
+
+
+class Stats:
+    __slots__ = ('name', 'hits', 'time')
+
+    def __init__(self, name:str):
+        '''
+        Amount of times something was run and the total time it took.
+        '''
+        self.name: str = name # text shown in the report
+        self.hits: int = 0 # amount of runs
+        self.time: float = 0 # cumulative time in seconds, including nested calls
+
+
+class Profiler:
+    def __init__(self, filename:str):
+        '''
+        Collects hit counts and time spent in commands and functions.
+
+        The engine only uses the profiler if profiling is enabled, by
+        wrapping its command handlers and its `call` and `execute` methods,
+        so it costs nothing otherwise.
+
+        Time is measured per source command (`Instruction.line`), per
+        command type and per function. Time spent in each call stack
+        without nested calls is also recorded to write collapsed stacks.
+        '''
+        self.filename: str = filename # project filename
+        self.lines: Dict[int, Stats] = {} # stats of source commands by command number
+        self.commands: Dict[str, Stats] = {} # stats of command types by name
+        self.functions: Dict[str, Stats] = {} # stats of functions by name
+        self.stacks: Dict[Tuple[str, ...], float] = {} # time spent in each call stack without nested calls
+        self.stack: List[str] = [] # current call stack
+        self.last: float = 0 # time when the current call stack was entered or left
+
+
+    def push(self, name:str):
+        '''
+        Enters a new frame of the call stack.
+        '''
+        now: float = time.perf_counter()
+        if self.stack:
+            key = tuple(self.stack)
+            self.stacks[key] = self.stacks.get(key, 0)+now-self.last
+        self.stack.append(name)
+        self.last = now
+
+
+    def pop(self):
+        '''
+        Leaves the current frame of the call stack.
+        '''
+        now: float = time.perf_counter()
+        key = tuple(self.stack)
+        self.stacks[key] = self.stacks.get(key, 0)+now-self.last
+        self.stack.pop()
+        self.last = now
+
+
+    def wrap_handler(self, handler:Callable) -> Callable:
+        '''
+        Returns a command handler that records the stats of every command it runs.
+        '''
+        def profiled(i:Instruction, frame:Frame) -> Optional[int]:
+            if i.line not in self.lines:
+                self.lines[i.line] = Stats(i.orig_line)
+            if i.instruction not in self.commands:
+                self.commands[i.instruction] = Stats(i.instruction)
+
+            self.push(f'{i.instruction} (command {i.line})')
+            start: float = time.perf_counter()
+            try:
+                return handler(i, frame)
+            finally:
+                elapsed: float = time.perf_counter()-start
+                self.pop()
+                for stats in [self.lines[i.line], self.commands[i.instruction]]:
+                    stats.hits += 1
+                    stats.time += elapsed
+
+        return profiled
+
+
+    def wrap_call(self, call:Callable) -> Callable:
+        '''
+        Returns a function call method that records the stats of every called function.
+        '''
+        def profiled(function:str, args:List[Variable]) -> Variable:
+            if function not in self.functions:
+                self.functions[function] = Stats(function)
+
+            self.push(function)
+            start: float = time.perf_counter()
+            try:
+                return call(function, args)
+            finally:
+                elapsed: float = time.perf_counter()-start
+                self.pop()
+                self.functions[function].hits += 1
+                self.functions[function].time += elapsed
+
+        return profiled
+
+
+    def wrap_execute(self, execute:Callable, blocks:Dict[int, str]) -> Callable:
+        '''
+        Returns a block execution method that starts a call stack for
+        every top-level block. `blocks` contains names of the blocks
+        with keys as ids of their instruction lists.
+        '''
+        def profiled(code:List[Instruction], frame:Frame=None) -> Variable:
+            if self.stack:
+                return execute(code, frame)
+
+            self.push(blocks.get(id(code), self.filename))
+            try:
+                return execute(code, frame)
+            finally:
+                self.pop()
+
+        return profiled
+
+
+    def report(self) -> str:
+        '''
+        Returns a text report with the slowest commands and functions first.
+        '''
+        total: float = sum(self.stacks.values())
+        lines: List[str] = [f'Profile of {self.filename}, {total*1000:.1f} ms in total', '']
+
+        sections = [
+            ('Functions', self.functions, lambda key: key),
+            ('Command types', self.commands, lambda key: key),
+            ('Commands', self.lines, lambda key: f'{key}: {self.lines[key].name}')
+        ]
+        for title, table, label in sections:
+            lines.append(title)
+            lines.append(f'{"hits":>10} {"total ms":>10} {"per hit us":>10}  name')
+            for key, stats in sorted(table.items(), key=lambda item: -item[1].time):
+                lines.append(
+                    f'{stats.hits:>10} {stats.time*1000:>10.2f} '\
+                        f'{stats.time/stats.hits*1_000_000:>10.2f}  {label(key)}'
+                )
+            lines.append('')
+
+        return '\n'.join(lines)
+
+
+    def collapsed(self) -> str:
+        '''
+        Returns the time spent in each call stack in microseconds,
+        in the collapsed stack format that flame graph tools read.
+        '''
+        return '\n'.join(
+            f'{";".join(stack)} {round(elapsed*1_000_000)}'
+                for stack, elapsed in sorted(self.stacks.items())
+                if round(elapsed*1_000_000) > 0
+        )+'\n'
+
+
+    def save(self, report_path:str, collapsed_path:str):
+        '''
+        Writes the text report and the collapsed stacks to files.
+        '''
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(self.report())
+        with open(collapsed_path, 'w', encoding='utf-8') as f:
+            f.write(self.collapsed())
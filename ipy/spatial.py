@@ -0,0 +1,223 @@
+from typing import *
+import math
+
+from .constants import *
+from .objects import *
+from .arrays import *
+
+
+CELL_SIZE = 32 # default width and height of a cell in pixels
+MAX_ENTITY_CELLS = 64 # entities touching more cells are compared with every query instead
+
+Rect = Tuple[float, float, float, float] # x, y, width and height
+Key = Tuple[int, Any] # type and value of an entity id
+
+
+class SpatialHash:
+    def __init__(self, cell_size:int=CELL_SIZE):
+        '''
+        Index of rectangles of entities for finding overlaps.
+
+        Every entity is stored in the square cells of a uniform grid that
+        its rectangle touches, so a query only compares rectangles in the
+        cells it touches instead of all entities. Entity ids are integers
+        or strings, stored as tuples of types and values like map keys.
+        Entities larger than `MAX_ENTITY_CELLS` cells are kept apart and
+        compared with every query, and queries larger than the amount of
+        entities compare all entities, so the work never grows with the
+        size of a rectangle. Results are in the order the entities were
+        added. Methods raise `ValueError` with a message for the user if
+        the values can't be used.
+        '''
+        if cell_size <= 0:
+            raise ValueError('Cell size must be greater than 0')
+        self.cell_size: int = cell_size # width and height of a cell in pixels
+        self.rects: Dict[Key, Rect] = {} # rectangle of every entity
+        self.order: Dict[Key, int] = {} # number of every entity in the order they were added
+        self.cells: Dict[Tuple[int,int], Set[Key]] = {} # entities in every non-empty cell
+        self.entity_cells: Dict[Key, List[Tuple[int,int]]] = {} # cells every entity is in
+        self.large: Set[Key] = set() # entities that touch too many cells to be stored in them
+        self.added: int = 0 # amount of entities added so far
+
+
+    def key(self, variable:Variable, action:str) -> Key:
+        '''
+        Returns the key an entity id is stored under.
+        '''
+        if variable.type not in [INTEGER, STRING]:
+            raise ValueError(f'{action} requires an entity id of type INTEGER or STRING')
+        return variable.type, variable.value
+
+
+    def check(self, rect:Rect):
+        '''
+        Checks that a rectangle can be sorted into cells.
+        '''
+        if False in [math.isfinite(value) for value in rect]:
+            raise ValueError('Coordinates must be finite')
+
+
+    def cell_range(self, rect:Rect) -> Tuple[int, int, int, int]:
+        '''
+        Returns the first and the last column and row of the cells a rectangle touches.
+        '''
+        x, y, width, height = rect
+        size: int = self.cell_size
+        return int(x//size), int((x+width)//size), int(y//size), int((y+height)//size)
+
+
+    def cell_count(self, rect:Rect) -> int:
+        '''
+        Returns the amount of cells a rectangle touches.
+        '''
+        first_column, last_column, first_row, last_row = self.cell_range(rect)
+        return max(last_column-first_column+1, 0)*max(last_row-first_row+1, 0)
+
+
+    def cells_of(self, rect:Rect) -> List[Tuple[int,int]]:
+        '''
+        Returns the cells a rectangle touches.
+        '''
+        first_column, last_column, first_row, last_row = self.cell_range(rect)
+        return [
+            (column, row)
+                for row in range(first_row, last_row+1)
+                for column in range(first_column, last_column+1)
+        ]
+
+
+    def link(self, key:Key, rect:Rect):
+        '''
+        Adds an entity to the cells its rectangle touches.
+        '''
+        if self.cell_count(rect) > MAX_ENTITY_CELLS:
+            self.large.add(key)
+            self.entity_cells[key] = []
+            return
+
+        cells: List[Tuple[int,int]] = self.cells_of(rect)
+        for cell in cells:
+            if cell not in self.cells:
+                self.cells[cell] = set()
+            self.cells[cell].add(key)
+        self.entity_cells[key] = cells
+
+
+    def unlink(self, key:Key):
+        '''
+        Removes an entity from its cells.
+        '''
+        self.large.discard(key)
+        for cell in self.entity_cells.pop(key):
+            entities: Set[Key] = self.cells[cell]
+            entities.discard(key)
+            if not entities:
+                del self.cells[cell]
+
+
+    def insert(self, key:Key, rect:Rect):
+        '''
+        Adds an entity or replaces the rectangle of an existing one.
+        '''
+        self.check(rect)
+        if key in self.rects:
+            self.unlink(key)
+        else:
+            self.order[key] = self.added
+            self.added += 1
+        self.rects[key] = rect
+        self.link(key, rect)
+
+
+    def move(self, key:Key, x:float, y:float):
+        '''
+        Moves the rectangle of an entity to a new position.
+        '''
+        if key not in self.rects:
+            raise ValueError(f'Entity {key[1]} not found')
+        _, _, width, height = self.rects[key]
+        rect: Rect = (x, y, width, height)
+        self.check(rect)
+        self.rects[key] = rect
+
+        # most moves stay in the same cells
+        if key not in self.large and self.cell_count(rect) <= MAX_ENTITY_CELLS\
+            and self.cells_of(rect) == self.entity_cells[key]:
+            return
+        self.unlink(key)
+        self.link(key, rect)
+
+
+    def remove(self, key:Key):
+        '''
+        Removes an entity.
+        '''
+        if key not in self.rects:
+            raise ValueError(f'Entity {key[1]} not found')
+        self.unlink(key)
+        del self.rects[key]
+        del self.order[key]
+
+
+    def overlaps(self, a:Rect, b:Rect) -> bool:
+        '''
+        Returns whether two rectangles overlap. Touching edges don't overlap.
+        '''
+        return a[0] < b[0]+b[2] and b[0] < a[0]+a[2] and a[1] < b[1]+b[3] and b[1] < a[1]+a[3]
+
+
+    def query(self, rect:Rect, exclude:Key=None) -> List[Key]:
+        '''
+        Returns the entities that overlap a rectangle.
+        '''
+        self.check(rect)
+        if self.cell_count(rect) > len(self.rects):
+            # comparing every entity is cheaper than visiting the cells
+            candidates: Set[Key] = set(self.rects)
+        else:
+            candidates = set(self.large)
+            for cell in self.cells_of(rect):
+                if cell in self.cells:
+                    candidates |= self.cells[cell]
+        candidates.discard(exclude)
+        return sorted(
+            [key for key in candidates if self.overlaps(rect, self.rects[key])],
+            key=self.order.__getitem__
+        )
+
+
+    def hits(self, key:Key) -> List[Key]:
+        '''
+        Returns the other entities that overlap an entity.
+        '''
+        if key not in self.rects:
+            raise ValueError(f'Entity {key[1]} not found')
+        return self.query(self.rects[key], key)
+
+
+    def pairs(self) -> List[Tuple[Key, Key]]:
+        '''
+        Returns every pair of overlapping entities once,
+        the one added first being the first of the pair.
+        '''
+        found: Set[Tuple[Key, Key]] = set()
+        for entities in self.cells.values():
+            if len(entities) < 2:
+                continue
+            keys: List[Key] = sorted(entities, key=self.order.__getitem__)
+            for index, a in enumerate(keys):
+                rect: Rect = self.rects[a]
+                for b in keys[index+1:]:
+                    if (a, b) not in found and self.overlaps(rect, self.rects[b]):
+                        found.add((a, b))
+        for large in self.large:
+            for other in self.query(self.rects[large], large):
+                found.add((large, other) if self.order[large] < self.order[other] else (other, large))
+        return sorted(found, key=lambda pair: (self.order[pair[0]], self.order[pair[1]]))
+
+
+    def ids_array(self, keys:List[Key]) -> Array:
+        '''
+        Returns an array of entity ids.
+        '''
+        return Array([shared_variable(type, value) for type, value in keys])
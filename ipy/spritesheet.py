@@ -1,9 +1,70 @@
 from typing import *
 from .errors import SpritesheetException
 import pygame as pg
+import math
 import numpy as np
 
 
+def convert_surface(surface:pg.Surface) -> pg.Surface:
+    '''
+    Returns a copy of a sprite in the pixel format of the display
+    with the same run-length encoded colorkey. Requires an open display.
+    '''
+    colorkey = surface.get_colorkey()
+    surface = surface.convert()
+    if colorkey is not None:
+        surface.set_colorkey(colorkey, pg.RLEACCEL)
+    return surface
+
+
+SCALE_STEP = 1/64 # scales are rounded to multiples of this
+ANGLE_STEP = 1 # angles are rounded to multiples of this many degrees
+MAX_TRANSFORM_SIZE = 2048 # largest width or height of a transformed sprite in pixels
+
+
+def quantize_transform(scale:float, angle:float) -> Tuple[float, float]:
+    '''
+    Rounds a scale and an angle in degrees, so close transforms of a sprite
+    share a cached surface. The angle is wrapped to 0-360.
+    '''
+    scale = max(round(scale/SCALE_STEP), 1)*SCALE_STEP
+    angle = round(angle/ANGLE_STEP)*ANGLE_STEP%360
+    return scale, angle
+
+
+def transformed_size(surface:pg.Surface, scale:float, angle:float) -> Tuple[float, float]:
+    '''
+    Returns the approximate size of a sprite after scaling and rotating it.
+    '''
+    width: float = surface.get_width()*scale
+    height: float = surface.get_height()*scale
+    cos: float = abs(math.cos(math.radians(angle)))
+    sin: float = abs(math.sin(math.radians(angle)))
+    return width*cos+height*sin, width*sin+height*cos
+
+
+def transform_surface(
+    surface:pg.Surface, scale:float, angle:float, flip_x:bool, flip_y:bool
+) -> Tuple[pg.Surface, Tuple[float, float]]:
+    '''
+    Returns a sprite flipped, scaled and rotated counterclockwise by `angle`
+    degrees around its center, with the colorkey of the original. Also
+    returns the offset to draw it at, so its center stays at the center
+    of the original sprite.
+    '''
+    colorkey = surface.get_colorkey()
+    width, height = surface.get_size()
+    if flip_x or flip_y:
+        surface = pg.transform.flip(surface, flip_x, flip_y)
+    if scale != 1:
+        surface = pg.transform.scale_by(surface, scale)
+    if angle != 0:
+        surface = pg.transform.rotate(surface, angle)
+    if colorkey is not None:
+        surface.set_colorkey(colorkey, pg.RLEACCEL)
+    return surface, ((width-surface.get_width())/2, (height-surface.get_height())/2)
+
+
 class IPYS:
     def __init__(self, code:str, filename:str):
         '''
@@ -146,11 +207,27 @@ class IPYS:
         '''
         surfaces: Dict[str, pg.Surface] = {}
         for i in self.sprites:
-            sprite = np.array(self.sprites[i])
+            # surfarray indexes pixels by x first
+            sprite = np.array(self.sprites[i]).transpose(1, 0, 2)
             surfaces[i] = pg.surfarray.make_surface(sprite)
-            # yep
-            surfaces[i] = pg.transform.rotate(surfaces[i], -90)
-            surfaces[i] = pg.transform.flip(surfaces[i], True, False)
-            surfaces[i].set_colorkey(self.blank)
+            self.set_colorkey(surfaces[i])
         
-        return surfaces
\ No newline at end of file
+        return surfaces
+
+
+    def set_colorkey(self, surface:pg.Surface):
+        '''
+        Makes the blank color of a sprite transparent. Sprites are
+        run-length encoded, so blits skip transparent pixels quickly.
+        '''
+        if self.blank is not None:
+            surface.set_colorkey(self.blank, pg.RLEACCEL)
+
+
+    def convert_surfaces(self):
+        '''
+        Converts all surfaces to the pixel format of the display, so they
+        don't have to be converted on every blit. Requires an open display.
+        '''
+        for i in self.surfaces:
+            self.surfaces[i] = convert_surface(self.surfaces[i])
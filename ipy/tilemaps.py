@@ -0,0 +1,125 @@
+from typing import *
+import math
+import pygame as pg
+
+
+CHUNK_SIZE = 16 # width and height of a chunk in tiles
+
+
+class Tilemap:
+    def __init__(self, width:int, height:int, tile_width:int, tile_height:int):
+        '''
+        Grid of sprites that is drawn as a few large surfaces.
+
+        The grid is split into chunks of `CHUNK_SIZE` by `CHUNK_SIZE`
+        tiles. Each chunk is rendered into its own surface the first time
+        it is visible and kept until one of its tiles changes, so drawing
+        the map only blits the chunks that are on screen. Methods raise
+        `ValueError` with a message for the user if the values can't be used.
+        '''
+        if width <= 0 or height <= 0:
+            raise ValueError('Tilemap size must be greater than 0')
+        if tile_width <= 0 or tile_height <= 0:
+            raise ValueError('Tile size must be greater than 0')
+        self.width: int = width # width in tiles
+        self.height: int = height # height in tiles
+        self.tile_width: int = tile_width # width of a tile in pixels
+        self.tile_height: int = tile_height # height of a tile in pixels
+        self.tiles: List[Optional[str]] = [None]*(width*height) # sprite names row by row, None for empty tiles
+        self.chunks: Dict[Tuple[int,int], Optional[pg.Surface]] = {} # rendered chunks by column and row, None if empty
+        self.changed: Set[Tuple[int,int]] = set() # rendered chunks that have to be rendered again
+
+
+    def index(self, x:int, y:int, action:str) -> int:
+        '''
+        Returns the position of a tile in `tiles`.
+        '''
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            raise ValueError(f'{action} requires a tile inside the {self.width}x{self.height} tilemap')
+        return y*self.width+x
+
+
+    def set(self, x:int, y:int, sprite:Optional[str]):
+        '''
+        Changes a tile. None clears it.
+        '''
+        index: int = self.index(x, y, 'SETTILE')
+        if self.tiles[index] == sprite:
+            return
+        self.tiles[index] = sprite
+        chunk: Tuple[int,int] = (x//CHUNK_SIZE, y//CHUNK_SIZE)
+        if chunk in self.chunks:
+            self.changed.add(chunk)
+
+
+    def get(self, x:int, y:int) -> Optional[str]:
+        '''
+        Returns the sprite name of a tile, None if it is empty.
+        '''
+        return self.tiles[self.index(x, y, 'GETTILE')]
+
+
+    def invalidate(self):
+        '''
+        Drops all rendered chunks, for example after sprites were reloaded.
+        '''
+        self.chunks.clear()
+        self.changed.clear()
+
+
+    def render_chunk(self, column:int, row:int, sprites:Dict[str, pg.Surface]) -> Optional[pg.Surface]:
+        '''
+        Draws the tiles of a chunk onto a transparent surface.
+        Returns None if all of its tiles are empty.
+        '''
+        left: int = column*CHUNK_SIZE
+        top: int = row*CHUNK_SIZE
+        blits: List[Tuple[pg.Surface, Tuple[int,int]]] = []
+        for y in range(top, min(top+CHUNK_SIZE, self.height)):
+            for x in range(left, min(left+CHUNK_SIZE, self.width)):
+                sprite: Optional[str] = self.tiles[y*self.width+x]
+                if sprite is None:
+                    continue
+                if sprite not in sprites:
+                    raise ValueError(f'Sprite {sprite} not found')
+                blits.append((sprites[sprite], ((x-left)*self.tile_width, (y-top)*self.tile_height)))
+        if not blits:
+            return None
+
+        surface = pg.Surface((CHUNK_SIZE*self.tile_width, CHUNK_SIZE*self.tile_height), pg.SRCALPHA)
+        surface.fblits(blits)
+        if pg.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        return surface
+
+
+    def visible(
+        self, x:float, y:float, bounds:pg.Rect, sprites:Dict[str, pg.Surface]
+    ) -> List[Tuple[pg.Surface, Tuple[float,float]]]:
+        '''
+        Returns the chunks that overlap `bounds` when the map is drawn
+        with its top left corner at (x, y), with their positions.
+        Chunks are rendered if they weren't yet or if their tiles changed.
+        '''
+        if not math.isfinite(x) or not math.isfinite(y):
+            raise ValueError('Coordinates must be finite')
+        chunk_width: int = CHUNK_SIZE*self.tile_width
+        chunk_height: int = CHUNK_SIZE*self.tile_height
+        columns: int = (self.width+CHUNK_SIZE-1)//CHUNK_SIZE
+        rows: int = (self.height+CHUNK_SIZE-1)//CHUNK_SIZE
+        first_column: int = max(int((bounds.left-x)//chunk_width), 0)
+        last_column: int = min(int((bounds.right-x)//chunk_width), columns-1)
+        first_row: int = max(int((bounds.top-y)//chunk_height), 0)
+        last_row: int = min(int((bounds.bottom-y)//chunk_height), rows-1)
+
+        blits: List[Tuple[pg.Surface, Tuple[float,float]]] = []
+        for row in range(first_row, last_row+1):
+            for column in range(first_column, last_column+1):
+                chunk: Tuple[int,int] = (column, row)
+                if chunk not in self.chunks or chunk in self.changed:
+                    self.chunks[chunk] = self.render_chunk(column, row, sprites)
+                    self.changed.discard(chunk)
+                surface: Optional[pg.Surface] = self.chunks[chunk]
+                if surface is not None:
+                    blits.append((surface, (x+column*chunk_width, y+row*chunk_height)))
+        return blits
@@ -0,0 +1,95 @@
+from typing import *
+from collections import deque
+import time
+
+
+# phases of a frame in the order they run
+PHASE_EVENTS = 0 # handling window events
+PHASE_SCRIPT = 1 # running the LOOP block
+PHASE_SCALE = 2 # scaling the game surface to the window
+PHASE_PRESENT = 3 # drawing the overlay and updating the display
+PHASE_SLEEP = 4 # waiting to keep the frame rate
+
+PHASES: List[str] = ['events', 'script', 'scale', 'present', 'sleep']
+
+HISTORY = 120 # amount of frames to keep timings of
+
+
+class FrameTimer:
+    def __init__(self, history:int=HISTORY):
+        '''
+        Measures how long each phase of a frame takes.
+
+        The app calls `start` once, `mark` after each phase and `finish`
+        after each frame. Timings of the last `history` frames are kept.
+        '''
+        self.frames: Deque[Tuple[float, ...]] = deque(maxlen=history) # phase times of finished frames in seconds
+        self.current: List[float] = [0]*len(PHASES) # phase times of the current frame
+        self.last: float = None # time of the last mark
+        self.sprites: int = 0 # amount of sprites drawn in the last frame
+
+
+    def start(self):
+        '''
+        Starts measuring the first frame.
+        '''
+        self.current = [0]*len(PHASES)
+        self.last = time.perf_counter()
+
+
+    def mark(self, phase:int):
+        '''
+        Adds the time since the last mark to a phase of the current frame.
+        '''
+        now: float = time.perf_counter()
+        self.current[phase] += now-self.last
+        self.last = now
+
+
+    def finish(self):
+        '''
+        Stores the timings of the current frame and starts the next one.
+        '''
+        self.frames.append(tuple(self.current))
+        self.current = [0]*len(PHASES)
+
+
+    def frame_time(self) -> float:
+        '''
+        Returns the time the last finished frame took in seconds, 0 if there is none.
+        '''
+        if not self.frames:
+            return 0.0
+        return sum(self.frames[-1])
+
+
+    def fps(self) -> float:
+        '''
+        Returns the average frame rate over the kept frames, 0 if there are none.
+        '''
+        total: float = sum([sum(frame) for frame in self.frames])
+        if total == 0:
+            return 0.0
+        return len(self.frames)/total
+
+
+    def average(self, phase:int) -> float:
+        '''
+        Returns the average time of a phase over the kept frames in seconds.
+        '''
+        if not self.frames:
+            return 0.0
+        return sum([frame[phase] for frame in self.frames])/len(self.frames)
+
+
+    def stats(self) -> Dict[str, float]:
+        '''
+        Returns the frame rate, the last frame time, the average time of
+        every phase in milliseconds and the sprites drawn in the last frame.
+        '''
+        stats: Dict[str, float] = {
+            'fps': self.fps(), 'frame_ms': self.frame_time()*1000, 'sprites': self.sprites
+        }
+        for phase, name in enumerate(PHASES):
+            stats[f'{name}_ms'] = self.average(phase)*1000
+        return stats
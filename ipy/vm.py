@@ -0,0 +1,244 @@
+from typing import *
+
+from .errors import *
+from .functions import *
+from .constants import *
+from .objects import *
+
+
+# bytecode operations
+VM_GENERIC = 0 # runs the command handler of the instruction
+VM_ASSIGN = 1
+VM_ADD = 2
+VM_SUB = 3
+VM_MUL = 4
+VM_DIV = 5
+VM_JUMP = 6
+VM_IFEQUALS = 7
+VM_IFDIFF = 8
+VM_IFGREATER = 9
+VM_IFSMALLER = 10
+VM_RETURN = 11
+VM_BREAK = 12
+
+ARITHMETIC = {
+    OP_ADD: VM_ADD,
+    OP_SUB: VM_SUB,
+    OP_MUL: VM_MUL,
+    OP_DIV: VM_DIV
+}
+
+CONDITIONS = {
+    OP_IFEQUALS: VM_IFEQUALS,
+    OP_IFDIFF: VM_IFDIFF,
+    OP_IFGREATER: VM_IFGREATER,
+    OP_IFSMALLER: VM_IFSMALLER
+}
+
+NUMBERS = (INTEGER, FLOAT)
+
+
+class Bytecode:
+    def __init__(self, code:List[Instruction]):
+        '''
+        Block of code compiled for the virtual machine.
+
+        Each operation is a tuple of `(operation, a, b, target, handler, instruction)`.
+        Operands `a` and `b` are variable slots if positive or indexes in
+        the constant pool inverted with `~` if negative. Function arguments
+        are appended to the constant pool when the block is run. The handler
+        of the original instruction is used when an operation can't take
+        the fast path.
+        '''
+        self.code: List[Instruction] = code # original instructions
+        self.ops: List[tuple] = [] # list of operations
+        self.constants: List[Variable] = [] # constant pool
+        self.positions: List[int] = [] # operation index for each instruction index
+
+
+class VM:
+    def __init__(self, engine):
+        '''
+        Register virtual machine that runs compiled IPYP code.
+
+        Registers are the variable slots of the engine, so the VM and
+        the command handlers share the same variables.
+        '''
+        self.engine = engine # IPYP object the code belongs to
+        self.programs: Dict[int, Bytecode] = {} # compiled blocks with keys as ids of the original lists
+
+        for code in engine.blocks():
+            self.compile(code)
+
+
+    def operand(self, bytecode:Bytecode, operand:Operand) -> int:
+        '''
+        Returns a register or an inverted constant pool index of an operand.
+        '''
+        if isinstance(operand, Constant):
+            bytecode.constants.append(operand.variable)
+            return ~(len(bytecode.constants)-1)
+        if isinstance(operand, Local):
+            return operand # replaced when the size of the constant pool is known
+        return operand.slot
+
+
+    def compile(self, code:List[Instruction]) -> Bytecode:
+        '''
+        Compiles a block of instructions into bytecode.
+        '''
+        bytecode = Bytecode(code)
+        handlers: List[Callable] = self.engine.handlers
+        ops: List[list] = []
+
+        for i in code:
+            bytecode.positions.append(len(ops))
+            handler: Callable = handlers[i.opcode]
+            simple: bool = True not in [isinstance(op, (Call, MapItem)) for op in i.operands]
+            op: list = [VM_GENERIC, None, None, None, handler, i]
+
+            # commands that produce no operations
+            if i.opcode == OP_NOOP or i.opcode == OP_POINT:
+                continue
+
+            # the profiler times command handlers, so every command runs its handler
+            if self.engine.profiler is not None:
+                pass
+
+            # jumps
+            elif i.opcode == OP_GOTO:
+                op[0:4] = [VM_JUMP, None, None, i.jump]
+
+            elif i.opcode == OP_BREAK:
+                op[0] = VM_BREAK
+
+            elif i.opcode == OP_RETURN and simple:
+                op[0:2] = [VM_RETURN, self.operand(bytecode, i.operands[0])]
+
+            elif i.opcode in CONDITIONS and simple:
+                op[0:4] = [
+                    CONDITIONS[i.opcode],
+                    self.operand(bytecode, i.operands[0]),
+                    self.operand(bytecode, i.operands[1]),
+                    i.jump
+                ]
+
+            # variables
+            elif i.opcode == OP_ASSIGN and simple:
+                op[0:3] = [VM_ASSIGN, i.operands[0].slot, self.operand(bytecode, i.operands[1])]
+
+            elif i.opcode in ARITHMETIC and simple:
+                op[0:3] = [ARITHMETIC[i.opcode], i.operands[0].slot, self.operand(bytecode, i.operands[1])]
+
+            ops.append(op)
+
+        # converting instruction indexes to operation indexes
+        bytecode.positions.append(len(ops))
+        for op in ops:
+            if op[3] is not None:
+                op[3] = bytecode.positions[min(op[3], len(code))]
+            # function arguments go after the constants
+            for index in [1, 2]:
+                if isinstance(op[index], Local):
+                    op[index] = ~(len(bytecode.constants)+op[index].index)
+        bytecode.ops = [tuple(op) for op in ops]
+
+        self.programs[id(code)] = bytecode
+        return bytecode
+
+
+    def run(self, code:List[Instruction], frame:Frame=None) -> Variable:
+        '''
+        Runs a block of instructions on the VM.
+        '''
+        if len(code) == 0:
+            return RETURN_NULL
+        bytecode: Bytecode = self.programs.get(id(code)) or self.compile(code)
+
+        ops: List[tuple] = bytecode.ops
+        constants: List[Variable] = bytecode.constants+frame.locals if frame else bytecode.constants
+        positions: List[int] = bytecode.positions
+        variables: List[Variable] = self.engine.variables
+        names: List[str] = self.engine.scope.names
+        if frame is None:
+            frame = Frame()
+        length: int = len(ops)
+        pc: int = 0 # current operation index
+
+        while pc < length:
+            kind, a, b, target, handler, i = ops[pc]
+
+            # arithmetic
+            if kind == VM_ADD or kind == VM_SUB or kind == VM_MUL or kind == VM_DIV:
+                var = variables[a]
+                value = variables[b] if b >= 0 else constants[~b]
+                if var is not None and value is not None\
+                    and var.type in NUMBERS and value.type in NUMBERS:
+                    if kind == VM_ADD:
+                        var.value += value.value
+                    elif kind == VM_SUB:
+                        var.value -= value.value
+                    elif kind == VM_MUL:
+                        var.value *= value.value
+                    else:
+                        var.value /= value.value
+                    if kind == VM_DIV or value.type == FLOAT:
+                        var.type = FLOAT
+                    pc += 1
+                    continue
+
+            # conditions
+            elif kind == VM_IFEQUALS or kind == VM_IFDIFF or kind == VM_IFGREATER or kind == VM_IFSMALLER:
+                var1 = variables[a] if a >= 0 else constants[~a]
+                var2 = variables[b] if b >= 0 else constants[~b]
+                if var1 is not None and var2 is not None:
+                    if kind == VM_IFEQUALS:
+                        pc = pc+1 if var1.value == var2.value else target
+                        continue
+                    if kind == VM_IFDIFF:
+                        pc = pc+1 if var1.value != var2.value else target
+                        continue
+                    if var1.type in NUMBERS and var2.type in NUMBERS:
+                        if kind == VM_IFGREATER:
+                            pc = pc+1 if var1.value > var2.value else target
+                        else:
+                            pc = pc+1 if var1.value < var2.value else target
+                        continue
+
+            # jumps
+            elif kind == VM_JUMP:
+                pc = target
+                continue
+
+            # variables
+            elif kind == VM_ASSIGN:
+                value = variables[b] if b >= 0 else constants[~b]
+                if value is not None:
+                    var = variables[a]
+                    if var is None:
+                        variables[a] = Variable(names[a], value.type, value.value)
+                    else:
+                        var.type = value.type
+                        var.value = value.value
+                    pc += 1
+                    continue
+
+            # finishing execution
+            elif kind == VM_RETURN:
+                value = variables[a] if a >= 0 else constants[~a]
+                if value is not None:
+                    return value
+
+            elif kind == VM_BREAK:
+                return RETURN_NULL
+
+            # running the command handler
+            jump = handler(i, frame)
+            if jump is None:
+                pc += 1
+            elif jump == STOP:
+                return frame.value
+            else:
+                pc = positions[min(jump, len(code))]
+
+        return RETURN_NULL
@@ -1,16 +1,27 @@
 from typing import *
+import argparse
 import ipy
 import os
 import sys
 
-def run_app(path:str):
+CACHE_DIR = '__ipycache__' # directory for compiled code next to the project file
+
+def run_app(
+    path:str, backend:str=ipy.INTERPRETER, memoize:int=0,
+    optimize:int=ipy.OPTIMIZE_NONE, cache:str=CACHE_DIR, profile:bool=False,
+    dirty:bool=False, transform_cache:int=ipy.TRANSFORM_CACHE_SIZE
+):
     # reading file
     with open(path, encoding='utf-8') as f:
-        ipyp = ipy.IPYP(f.read(), os.path.basename(path))
+        ipyp = ipy.IPYP(
+            f.read(), os.path.basename(path), [], backend, memoize, optimize, cache, profile, transform_cache
+        )
+    if optimize:
+        print(f'Optimizer removed {ipyp.removed} instructions', file=sys.stderr)
     
     # compiling
     try:
-        app = ipy.App(ipyp)
+        app = ipy.App(ipyp, dirty=dirty)
     except ipy.BaseException as e:
         print(e.text, file=sys.stderr)
 
@@ -19,14 +30,67 @@ def run_app(path:str):
         app.run()
     except ipy.BaseException as e:
         print(e.text, file=sys.stderr)
+    finally:
+        if profile:
+            name = os.path.splitext(path)[0]
+            ipyp.profiler.save(f'{name}.profile.txt', f'{name}.folded')
+            print(f'Profile written to {name}.profile.txt and {name}.folded', file=sys.stderr)
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print('Usage: python runner.py <ipyp-file>', file=sys.stderr)
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description='Runs an IPYP project.')
+    parser.add_argument('file', help='path to the .ipyp file')
+    parser.add_argument(
+        '--backend', choices=ipy.BACKENDS, default=ipy.INTERPRETER,
+        help='how to execute the code (default: interpreter)'
+    )
+    parser.add_argument(
+        '--memoize', type=int, default=0, metavar='N',
+        help='cache up to N results of pure functions (default: 0, disabled)'
+    )
+    parser.add_argument(
+        '--optimize', type=int, choices=ipy.OPTIMIZATION_LEVELS, default=ipy.OPTIMIZE_NONE,
+        help='optimization level: 0 runs the code as written, 1 applies safe optimizations, '\
+            '2 also merges additions to the same variable (default: 0)'
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help=f'always compile the project instead of using compiled code from {CACHE_DIR}'
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help='write time spent in each command and function to FILE.profile.txt '\
+            'and collapsed stacks for flame graphs to FILE.folded on exit'
+    )
+    parser.add_argument(
+        '--dirty-rects', action='store_true',
+        help='only redraw the regions of the window that changed since the last frame'
+    )
+    parser.add_argument(
+        '--transform-cache', type=float, default=ipy.TRANSFORM_CACHE_SIZE/1024/1024, metavar='MB',
+        help=f'memory for scaled, rotated and flipped sprites drawn with DRAWTRANSFORM '\
+            f'(default: {ipy.TRANSFORM_CACHE_SIZE//1024//1024})'
+    )
+    parser.add_argument(
+        '--benchmark', type=int, metavar='FRAMES',
+        help='run FRAMES frames without a window and with the frame rate not limited, '\
+            'then print frame time percentiles and instructions per frame'
+    )
+    args = parser.parse_args()
 
-    file = os.path.abspath(sys.argv[1])
+    file = os.path.abspath(args.file)
     path = os.path.dirname(file)
     os.chdir(path)
-    run_app(os.path.basename(file))
+    if args.benchmark is not None:
+        with open(file, encoding='utf-8') as f:
+            stats = ipy.run_headless(
+                f.read(), os.path.basename(file), args.benchmark, args.backend, args.optimize,
+                memoize=args.memoize, transform_cache=int(args.transform_cache*1024*1024)
+            )
+        print(stats.report())
+        sys.exit()
+    run_app(
+        os.path.basename(file), args.backend, args.memoize, args.optimize,
+        None if args.no_cache else CACHE_DIR, args.profile, args.dirty_rects,
+        int(args.transform_cache*1024*1024)
+    )
     
\ No newline at end of file